@@ -0,0 +1,145 @@
+"""
+Headless batch generation. Solves many grids in parallel across a pool of worker processes and writes each solved
+grid to an output directory as soon as it finishes.
+
+Run from this directory, like the other entry points:
+    python batch.py --tile-set circles --width 50 --height 50 --count 1000 --seed 0
+"""
+from contextlib import redirect_stdout
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from app.solver.cache import ResultCache
+from app.solver.settings import SolverConfig, ROOT_PATH
+from app.solver.solver import Solver
+
+#Each worker process builds one solver and reuses its grid for every job it is given
+worker_solver = None
+#and, when images are written, one renderer holding the tile set's prepared images
+worker_renderer = None
+worker_image_format = None
+
+
+def init_worker(config, cache_dir=None, cache_size=None, image_format=None, cell_size=16):
+    """Builds the worker's solver from the config parsed by the main process, sharing the on-disk result cache if one
+    is given, and a renderer if images are written."""
+    global worker_solver, worker_renderer, worker_image_format
+    cache = ResultCache(cache_dir, cache_size) if cache_dir else None
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        worker_solver = Solver(config=config, cache=cache)
+    if image_format:
+        from app.pillow.renderer import GridRenderer
+        worker_renderer = GridRenderer(worker_solver.grid.all_tiles, cell_size)
+        worker_image_format = image_format
+
+
+def solve_job(seed, output_dir):
+    """Solves one grid with the given seed and writes it to the output directory.
+    Returns:
+        dict describing the job."""
+    start = time.perf_counter()
+    cache = worker_solver.cache
+    hits = cache.hits if cache else 0
+    # The solver reports every contradiction to stdout, which only the main process should be writing to
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        solved = worker_solver.solve(seed=seed)
+    grid = worker_solver.grid
+    result = {
+        "seed": seed,
+        "solved": solved,
+        "cached": bool(cache) and cache.hits > hits,
+        "restarts": worker_solver.restarts,
+        "seconds": time.perf_counter() - start,
+        "path": None,
+        "image": None,
+    }
+    if solved:
+        result["path"] = write_grid(grid, seed, output_dir)
+        if worker_renderer is not None:
+            result["image"] = write_image(grid, seed, output_dir)
+    return result
+
+
+def write_grid(grid, seed, output_dir):
+    """Writes a solved grid as JSON: a legend of the tiles, and the tile index of every cell in x-major order.
+    Returns:
+        the path written to."""
+    path = os.path.join(output_dir, f"grid_{grid.width}x{grid.height}_{seed}.json")
+    with open(path, 'w') as file:
+        json.dump({
+            "seed": seed,
+            "width": grid.width,
+            "height": grid.height,
+            "tiles": [{"id": tile.id, "rotations": tile.rotations} for tile in grid.all_tiles],
+            "grid": grid.wave.tile_indexes(),
+        }, file)
+    return path
+
+
+def write_image(grid, seed, output_dir):
+    """Renders a solved grid with the worker's renderer and writes it next to its JSON.
+    Returns:
+        the path written to."""
+    from app.pillow.renderer import save_image
+    path = os.path.join(output_dir, f"grid_{grid.width}x{grid.height}_{seed}.{worker_image_format}")
+    return save_image(worker_renderer.render_grid(grid), path)
+
+
+def run_batch(tile_set_name, width, height, count, seed, output_dir, workers=None, cache_dir=None,
+              cache_size=64 * 1024 * 1024, image_format=None, cell_size=16, compile_tileset=True):
+    """Solves count grids with seeds seed, seed + 1, ... and streams them to output_dir.
+    Grids already in the result cache at cache_dir are written without being solved again.
+    If image_format is png or webp, every grid is also rendered to an image with cells of cell_size pixels.
+    compile_tileset is passed on to every worker's grid, see Grid.
+    Returns:
+        list of the job results, in the order they finished."""
+    os.makedirs(output_dir, exist_ok=True)
+    config = SolverConfig.from_settings(tile_set_name=tile_set_name, width=width, height=height)
+    config.compile_tileset = compile_tileset
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(config, cache_dir, cache_size, image_format, cell_size)) as executor:
+        futures = [executor.submit(solve_job, seed + i, output_dir) for i in range(count)]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            status = result["path"] if result["solved"] else "failed"
+            if result["cached"]:
+                status += " (cached)"
+            print(f"[{len(results)}/{count}] seed {result['seed']}: {status} "
+                  f"({result['restarts']} restarts, {result['seconds']:.2f}s)")
+    elapsed = time.perf_counter() - start
+
+    solved = sum(result["solved"] for result in results)
+    print(f"Solved {solved}/{count} grids in {elapsed:.2f}s")
+    print(f"{solved / elapsed:.2f} grids/sec, {solved * width * height / elapsed:.0f} cells/sec")
+    print(f"{sum(result['restarts'] for result in results)} restarts, "
+          f"{sum(result['cached'] for result in results)} grids from the cache")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate many wave function collapse grids in parallel.")
+    parser.add_argument("--tile-set", required=True, help="name of a tile set folder in base_tiles")
+    parser.add_argument("--width", type=int, required=True)
+    parser.add_argument("--height", type=int, required=True)
+    parser.add_argument("--count", type=int, default=1, help="number of grids to generate")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first grid. Grid i uses seed + i")
+    parser.add_argument("--output", default=str(ROOT_PATH / "output" / "batch"),
+                        help="directory to write solved grids to")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes. Defaults to one per CPU")
+    parser.add_argument("--cache", default=None, help="directory of the solved grid cache. Disabled if not given")
+    parser.add_argument("--cache-size", type=int, default=64, help="size of the solved grid cache in megabytes")
+    parser.add_argument("--image", choices=["png", "webp"], default=None,
+                        help="also render every grid to an image of this format")
+    parser.add_argument("--cell-size", type=int, default=16, help="size of a cell in rendered images, in pixels")
+    args = parser.parse_args(argv)
+    run_batch(args.tile_set, args.width, args.height, args.count, args.seed, args.output, args.workers,
+              args.cache, args.cache_size * 1024 * 1024, args.image, args.cell_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Benchmarks of the solver. Times grid construction, get_lowest_entropy_nodes, propagate and full solves for each tile set
+at several grid sizes with fixed seeds, and writes the results as JSON so runs can be compared.
+
+Run from this directory, like the other entry points. Results are written to output/benchmarks in the repository
+wherever it is run from:
+    python benchmark.py
+    python benchmark.py --tile-sets circles pcb --sizes 16 32 --compare baseline.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from app.solver.grid import Grid
+from app.solver.settings import ROOT_PATH, SolverConfig
+from app.solver.solver import Solver
+
+TILE_SETS = ["circles", "grass_tiles", "pcb", "set1"]
+SIZES = [8, 16, 32]
+SEEDS = [0, 1, 2]
+#Metrics compared between runs, and whether a larger value is better
+COMPARED_METRICS = {"construct_seconds": False, "lowest_entropy_seconds": False, "propagate_seconds": False,
+                    "solve_seconds": False, "steps_per_second": True, "cells_per_second": True}
+
+
+def best_time(function, repeat):
+    """Calls function repeat times.
+    Returns:
+        the fastest call's duration in seconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class PropagateTimer:
+    """Stands in for a grid's propagate method, timing every call before passing it on."""
+    def __init__(self, propagate):
+        self.propagate = propagate
+        self.calls = 0
+        self.seconds = 0.0
+
+    def __call__(self, node):
+        start = time.perf_counter()
+        result = self.propagate(node)
+        self.seconds += time.perf_counter() - start
+        self.calls += 1
+        return result
+
+
+def solve_run(solver, seed, max_restarts):
+    """Solves the solver's grid from a seed, giving up after max_restarts restarts.
+    Returns:
+        (solved, number of steps)"""
+    solver.restarts = 0
+    solver.grid.set_seed(seed)
+    solver.reset()
+    steps = 0
+    while not solver.is_solved() and solver.restarts <= max_restarts:
+        solver.solve_next()
+        steps += 1
+    return solver.is_solved() and not solver.grid.failed_collapsing, steps
+
+
+def benchmark_case(config, seeds, repeat=3, max_restarts=1000, memory=True):
+    """Benchmarks one tile set at one grid size.
+    Parameters:
+        config: SolverConfig of the tile set and grid size
+        seeds: seeds of the full solves
+        repeat: micro benchmarks keep the fastest of this many calls
+        max_restarts: a solve is abandoned, and reported unsolved, after this many restarts
+        memory: whether to solve each seed again under tracemalloc to measure peak memory
+    Returns:
+        dict of the case's results, with one entry in runs per seed."""
+    def build_grid(compile_tileset):
+        return Grid(config.tile_set_filepath, config.width, config.height, config.directions,
+                    propagation_engine=config.propagation_engine, entropy_heuristic=config.entropy_heuristic,
+                    compile_tileset=compile_tileset)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        solver = Solver(config=config)
+        grid = solver.grid
+        result = {
+            "tile_set": config.tile_set_name,
+            "width": config.width,
+            "height": config.height,
+            "tiles": len(grid.all_tiles),
+            "construct_seconds": best_time(lambda: build_grid(True), repeat),
+            "construct_uncompiled_seconds": best_time(lambda: build_grid(False), repeat),
+        }
+        solver.reset()
+        result["lowest_entropy_seconds"] = best_time(grid.get_lowest_entropy_nodes, repeat)
+
+        runs = []
+        for seed in seeds:
+            timer = PropagateTimer(grid.propagate)
+            grid.propagate = timer
+            start = time.perf_counter()
+            solved, steps = solve_run(solver, seed, max_restarts)
+            seconds = time.perf_counter() - start
+            del grid.propagate
+            run = {
+                "seed": seed,
+                "solved": solved,
+                "steps": steps,
+                "restarts": solver.restarts,
+                "solve_seconds": seconds,
+                "steps_per_second": steps / seconds,
+                "cells_per_second": config.width * config.height / seconds if solved else 0.0,
+                "propagate_calls": timer.calls,
+                "propagate_seconds": timer.seconds / timer.calls if timer.calls else 0.0,
+                "peak_memory_bytes": None,
+            }
+            if memory:
+                tracemalloc.start()
+                solve_run(solver, seed, max_restarts)
+                run["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            runs.append(run)
+
+    result["runs"] = runs
+    for metric in ("solve_seconds", "steps_per_second", "cells_per_second", "propagate_seconds"):
+        result[metric] = statistics.median(run[metric] for run in runs)
+    result["restarts"] = sum(run["restarts"] for run in runs)
+    result["solved"] = sum(run["solved"] for run in runs)
+    if memory:
+        result["peak_memory_bytes"] = max(run["peak_memory_bytes"] for run in runs)
+    return result
+
+
+def git_commit():
+    """Returns the commit the repository is at, or None if it cannot be read."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT_PATH, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(tile_sets=TILE_SETS, sizes=SIZES, seeds=SEEDS, repeat=3, max_restarts=1000, memory=True,
+                   fail_condition="RESET"):
+    """Benchmarks every tile set at every size.
+    Returns:
+        dict of the results of every case, and of the machine and commit they were measured on."""
+    results = []
+    for tile_set_name in tile_sets:
+        for size in sizes:
+            config = SolverConfig.from_settings(tile_set_name=tile_set_name, width=size, height=size)
+            config.fail_condition = fail_condition
+            result = benchmark_case(config, seeds, repeat, max_restarts, memory)
+            results.append(result)
+            memory_note = f", peak {result['peak_memory_bytes'] / 1024:.0f} KiB" if memory else ""
+            print(f"{tile_set_name} {size}x{size}: solved {result['solved']}/{len(seeds)}, "
+                  f"{result['steps_per_second']:.0f} steps/sec, {result['cells_per_second']:.0f} cells/sec, "
+                  f"{result['restarts']} restarts, construct {result['construct_seconds'] * 1000:.1f}ms"
+                  f"{memory_note}")
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seeds": list(seeds),
+        "fail_condition": fail_condition,
+        "max_restarts": max_restarts,
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold=0.2):
+    """Compares a report against an earlier one, case by case.
+    Parameters:
+        threshold: a metric regresses when it is this fraction worse than in the baseline
+    Returns:
+        list of (tile set, width, height, metric, baseline value, new value) of every regression."""
+    cases = {(case["tile_set"], case["width"], case["height"]): case for case in baseline["results"]}
+    regressions = []
+    for case in report["results"]:
+        key = (case["tile_set"], case["width"], case["height"])
+        if key not in cases:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = cases[key].get(metric), case.get(metric)
+            if not old or not new:
+                continue
+            ratio = old / new if higher_is_better else new / old
+            if ratio > 1 + threshold:
+                regressions.append((*key, metric, old, new))
+    return regressions
+
+
+def write_report(report, output_dir):
+    """Writes a report to a new JSON file in output_dir.
+    Returns:
+        the path written to."""
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"benchmark_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, 'w') as file:
+        json.dump(report, file, indent=2)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the wave function collapse solver.")
+    parser.add_argument("--tile-sets", nargs="+", default=TILE_SETS, help="names of tile set folders in base_tiles")
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES, help="widths of the square grids to solve")
+    parser.add_argument("--seeds", nargs="+", type=int, default=SEEDS, help="seeds of the full solves")
+    parser.add_argument("--repeat", type=int, default=3, help="micro benchmarks keep the fastest of this many calls")
+    parser.add_argument("--max-restarts", type=int, default=1000,
+                        help="abandon a solve after this many restarts and report it unsolved")
+    parser.add_argument("--fail-condition", default="RESET", choices=["RESET", "RESET_FROM_FAIL", "BACKTRACK"])
+    parser.add_argument("--no-memory", action="store_true", help="skip measuring peak memory under tracemalloc")
+    parser.add_argument("--output", default=str(ROOT_PATH / "output" / "benchmarks"),
+                        help="directory to write the results to")
+    parser.add_argument("--compare", default=None, help="results of an earlier run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="fraction by which a metric must worsen to count as a regression")
+    args = parser.parse_args(argv)
+    report = run_benchmarks(args.tile_sets, args.sizes, args.seeds, args.repeat, args.max_restarts,
+                            not args.no_memory, args.fail_condition)
+    print(f"Wrote {write_report(report, args.output)}")
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(report, json.load(file), args.threshold)
+        for tile_set_name, width, height, metric, old, new in regressions:
+            print(f"regression: {tile_set_name} {width}x{height} {metric} {old:.6g} -> {new:.6g}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -49,6 +49,12 @@ class Settings(QWidget):
         self.debug_checkbox.setChecked(self.config.getboolean('debug', 'DEBUG'))
         self.debug_checkbox.stateChanged.connect(self.toggle_debug)
 
+        #Profile
+        profile_label = QLabel("Profile:", self)
+        self.profile_checkbox = QCheckBox()
+        self.profile_checkbox.setChecked(self.config.getboolean('debug', 'PROFILE', fallback=False))
+        self.profile_checkbox.stateChanged.connect(self.toggle_profile)
+
         #Fail Condition
         fail_condition_label = QLabel("Fail Condition:", self)
         self.fail_condition_combo = QComboBox()
@@ -58,6 +64,32 @@ class Settings(QWidget):
         self.fail_condition_combo.setCurrentText(fail_condition)
         self.fail_condition_combo.currentTextChanged.connect(self.change_fail_condition)
 
+        #Backtrack Depth
+        backtrack_depth_label = QLabel("Backtrack Depth:", self)
+        self.backtrack_depth = QSpinBox(self)
+        self.backtrack_depth.setRange(1, 10000)
+        self.backtrack_depth.setSingleStep(10)
+        self.backtrack_depth.setValue(self.config.getint('contradiction', 'BACKTRACK_DEPTH'))
+        self.backtrack_depth.textChanged.connect(self.change_backtrack_depth)
+
+        #Propagation Engine
+        propagation_engine_label = QLabel("Propagation Engine:", self)
+        self.propagation_engine_combo = QComboBox()
+        propagation_engine_options = self.config['propagation']['PROPAGATION_ENGINE_OPTIONS'].split(',')
+        self.propagation_engine_combo.addItems(propagation_engine_options)
+        propagation_engine = self.config['propagation']['PROPAGATION_ENGINE']
+        self.propagation_engine_combo.setCurrentText(propagation_engine)
+        self.propagation_engine_combo.currentTextChanged.connect(self.change_propagation_engine)
+
+        #Entropy Heuristic
+        entropy_heuristic_label = QLabel("Entropy Heuristic:", self)
+        self.entropy_heuristic_combo = QComboBox()
+        entropy_heuristic_options = self.config['propagation']['ENTROPY_HEURISTIC_OPTIONS'].split(',')
+        self.entropy_heuristic_combo.addItems(entropy_heuristic_options)
+        entropy_heuristic = self.config['propagation']['ENTROPY_HEURISTIC']
+        self.entropy_heuristic_combo.setCurrentText(entropy_heuristic)
+        self.entropy_heuristic_combo.currentTextChanged.connect(self.change_entropy_heuristic)
+
         #Display - width
         screen_width_label = QLabel("Screen Width:", self)
         self.screen_width = QSpinBox(self)
@@ -115,16 +147,40 @@ class Settings(QWidget):
         grid.addWidget(self.dimension_height, 5, 1)
         grid.addWidget(tile_set_label, 6, 0)
         grid.addWidget(self.tile_set_combo, 6, 1)
+        grid.addWidget(propagation_engine_label, 7, 0)
+        grid.addWidget(self.propagation_engine_combo, 7, 1)
+        grid.addWidget(entropy_heuristic_label, 8, 0)
+        grid.addWidget(self.entropy_heuristic_combo, 8, 1)
+        grid.addWidget(backtrack_depth_label, 9, 0)
+        grid.addWidget(self.backtrack_depth, 9, 1)
+        grid.addWidget(profile_label, 10, 0)
+        grid.addWidget(self.profile_checkbox, 10, 1)
         self.setLayout(grid)
 
     def toggle_debug(self):
         self.config['debug']['DEBUG'] = str(self.debug_checkbox.isChecked())
         self.write()
 
+    def toggle_profile(self):
+        self.config['debug']['PROFILE'] = str(self.profile_checkbox.isChecked())
+        self.write()
+
     def change_fail_condition(self):
         self.config['contradiction']['FAIL_CONDITION'] = self.fail_condition_combo.currentText()
         self.write()
 
+    def change_backtrack_depth(self):
+        self.config['contradiction']['BACKTRACK_DEPTH'] = self.backtrack_depth.text()
+        self.write()
+
+    def change_propagation_engine(self):
+        self.config['propagation']['PROPAGATION_ENGINE'] = self.propagation_engine_combo.currentText()
+        self.write()
+
+    def change_entropy_heuristic(self):
+        self.config['propagation']['ENTROPY_HEURISTIC'] = self.entropy_heuristic_combo.currentText()
+        self.write()
+
     def change_screen_width(self):
         self.config['display']['SCREEN_WIDTH'] = self.screen_width.text()
         self.write()
@@ -0,0 +1,223 @@
+"""
+Overlapping model. Instead of tiles with sockets, the tiles are every N x N pattern of pixels found in a sample image,
+weighted by how often they occur. Two patterns may be neighbors when they agree on the N x (N - 1) pixels where they
+overlap once shifted one pixel apart. Each cell of the solved grid shows the top left pixel of its pattern.
+
+Patterns are extracted with NumPy sliding windows, encoded as integer keys, and deduplicated and counted in one pass.
+Compatibility is found through a hash index of the patterns' overlap regions, so it costs one lookup per pattern and
+direction rather than a comparison of every pair.
+
+Run from this directory:
+    python overlapping.py sample.png ../../output/images/overlapping.png --n 3 --symmetry 8 --width 48 --height 48
+"""
+from app.solver.tile import Tile, DEFAULT_DIRECTIONS
+from app.solver.propagator import Propagator
+from app.solver.wave import iter_bits
+from PIL import Image
+import argparse
+import hashlib
+import numpy as np
+
+#Direction -> the slices of a pattern and of its neighbor in that direction which overlap
+OVERLAPS = {
+    "up": ((slice(None, -1), slice(None)), (slice(1, None), slice(None))),
+    "right": ((slice(None), slice(1, None)), (slice(None), slice(None, -1))),
+    "down": ((slice(1, None), slice(None)), (slice(None, -1), slice(None))),
+    "left": ((slice(None), slice(None, -1)), (slice(None), slice(1, None))),
+}
+
+
+def symmetries(windows, symmetry):
+    """Yields the windows under the first few of the 8 rotations and reflections, as arrays of shape (M, N, N).
+    Parameters:
+        symmetry: 1 keeps the windows as they are, 2 adds their reflection, 8 adds every rotation and its reflection"""
+    for rotation in range(4):
+        rotated = np.rot90(windows, rotation, axes=(1, 2))
+        for reflected in (rotated, rotated[:, :, ::-1]):
+            if symmetry <= 0:
+                return
+            yield reflected
+            symmetry -= 1
+
+
+def pattern_keys(patterns, colors):
+    """Encodes every pattern of an array of shape (M, ...) of color indexes as one exact key, so patterns are equal
+    exactly when their keys are. Keys are integers in base colors when they fit in 64 bits, otherwise raw bytes.
+    Returns:
+        1D array of M keys."""
+    flat = np.ascontiguousarray(patterns.reshape(len(patterns), -1))
+    if colors ** flat.shape[1] <= 1 << 64:
+        powers = np.uint64(colors) ** np.arange(flat.shape[1], dtype=np.uint64)
+        return (flat.astype(np.uint64) * powers).sum(axis=1, dtype=np.uint64)
+    return flat.astype(np.uint8 if colors <= 256 else np.uint32).view(
+        np.dtype((np.void, flat.shape[1] * (1 if colors <= 256 else 4)))).ravel()
+
+
+class OverlappingModel:
+    """
+    The patterns of a sample image as a tile set, ready to be solved by a Grid. Pass it to Grid or Solver as tile_set.
+    """
+    def __init__(self, sample_path, n=3, symmetry=8, periodic=True, directions=DEFAULT_DIRECTIONS):
+        """
+            sample_path: path to the sample image
+            n: width and height of the patterns, in pixels
+            symmetry: how many of the 8 rotations and reflections of every pattern are added. 1 disables them
+            periodic: whether the sample wraps around, so patterns are also read across its edges
+            directions: names of the directions, in the order up, right, down, left
+            colors: array of the sample's distinct RGBA colors. Patterns hold indexes into it
+            patterns: array of shape (patterns, n, n) of every distinct pattern, in tile index order
+            counts: how many times each pattern occurs in the sample and its symmetries
+            index: hash index of pattern key, as bytes -> tile index
+            tiles: one Tile per pattern, weighted by its count
+            propagator: per-direction masks of compatible patterns
+            constraints: always empty, the overlapping model has no fixed cells
+            hash: hash of the sample and the model's parameters, identifying the tile set in the result cache
+        """
+        self.sample_path = str(sample_path)
+        self.n = n
+        self.symmetry = symmetry
+        self.periodic = periodic
+        self.directions = list(directions)
+        with open(self.sample_path, 'rb') as file:
+            digest = hashlib.sha256(file.read())
+        digest.update(f"{n}:{symmetry}:{periodic}:{','.join(self.directions)}".encode())
+        self.hash = digest.hexdigest()
+
+        with Image.open(self.sample_path) as image:
+            pixels = np.asarray(image.convert("RGBA"))
+        self.colors, sample = self.index_colors(pixels)
+        self.patterns, self.counts = self.extract_patterns(sample)
+        keys = pattern_keys(self.patterns, len(self.colors))
+        self.index = {key.tobytes(): i for i, key in enumerate(keys)}
+        self.tiles = [Tile(ext_id=i, image_path=self.sample_path, sides=dict(), weight=int(count))
+                      for i, count in enumerate(self.counts)]
+        self.propagator = Propagator(self.tiles, self.directions, masks=self.compatibility())
+        self.link_tiles()
+        self.constraints = dict()
+
+    def link_tiles(self):
+        """Sets every tile's valid neighbors from the propagator's compatibility masks."""
+        masks = self.propagator.masks
+        for i, tile in enumerate(self.tiles):
+            tile.valid_neighbors = {direction: {self.tiles[j] for j in iter_bits(masks[direction][i])}
+                                    for direction in self.directions}
+
+    def __getstate__(self):
+        """Pickles the model, as for Solver.solve_parallel, without the tiles' valid neighbors. Those link every
+        tile to the others, which pickle would follow as one deep recursion. They are rebuilt when unpickled."""
+        state = dict(self.__dict__)
+        state["tiles"] = [(tile.id, tile.weight) for tile in self.tiles]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.tiles = [Tile(ext_id=ext_id, image_path=self.sample_path, sides=dict(), weight=weight)
+                      for ext_id, weight in state["tiles"]]
+        self.link_tiles()
+
+    @staticmethod
+    def index_colors(pixels):
+        """Replaces every pixel of an RGBA array by the index of its color.
+        Returns:
+            (array of the distinct colors, 2D array of color indexes)"""
+        packed = pixels.view(np.uint32).reshape(pixels.shape[:2])
+        colors, sample = np.unique(packed, return_inverse=True)
+        return colors.view(np.uint8).reshape(-1, 4), sample.reshape(packed.shape)
+
+    def extract_patterns(self, sample):
+        """Finds every distinct n x n pattern of the sample and its symmetries, and counts them.
+        Returns:
+            (array of shape (patterns, n, n) of the distinct patterns, array of their counts)"""
+        n = self.n
+        if self.periodic:
+            sample = np.pad(sample, ((0, n - 1), (0, n - 1)), mode="wrap")
+        windows = np.lib.stride_tricks.sliding_window_view(sample, (n, n)).reshape(-1, n, n)
+        windows = np.concatenate(list(symmetries(windows, self.symmetry)))
+        keys = pattern_keys(windows, len(self.colors))
+        _, first, counts = np.unique(keys, return_index=True, return_counts=True)
+        #Patterns are numbered in the order they first appear in the sample
+        order = np.argsort(first)
+        return windows[first[order]], counts[order]
+
+    def compatibility(self):
+        """Finds, for every direction and pattern, the patterns which may neighbor it in that direction: those whose
+        overlapping pixels equal its own. Patterns are grouped by the key of their overlap region in a hash index,
+        so each pattern's neighbors are a single lookup.
+        Returns:
+            for each direction, list of compatible-pattern masks indexed by tile index."""
+        colors, count = len(self.colors), len(self.patterns)
+        masks = dict()
+        for direction in self.directions:
+            own, other = OVERLAPS[direction]
+            own_keys = pattern_keys(self.patterns[(slice(None),) + own], colors)
+            other_keys = pattern_keys(self.patterns[(slice(None),) + other], colors)
+            # Key of the overlap region -> mask of the patterns which would fit against it
+            unique_keys, groups = np.unique(other_keys, return_inverse=True)
+            order = np.argsort(groups, kind="stable")
+            bounds = np.searchsorted(groups[order], np.arange(len(unique_keys) + 1))
+            fits = dict()
+            for group, key in enumerate(unique_keys):
+                bits = np.zeros(count, dtype=bool)
+                bits[order[bounds[group]:bounds[group + 1]]] = True
+                fits[key.tobytes()] = int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+            masks[direction] = [fits.get(key.tobytes(), 0) for key in own_keys]
+        return masks
+
+    def pattern_index(self, pattern):
+        """Returns the tile index of an n x n array of color indexes, or None if the sample has no such pattern."""
+        key = pattern_keys(np.asarray(pattern)[np.newaxis], len(self.colors))[0]
+        return self.index.get(key.tobytes())
+
+    def render(self, grid, scale=1):
+        """Renders a grid solved with this model, one pixel per cell showing the top left pixel of its pattern.
+        Cells not collapsed yet show the weighted average of their remaining patterns' pixels.
+        Parameters:
+            scale: size of a cell in the output image, in pixels
+        Returns:
+            the rendered Image"""
+        first_pixels = self.colors[self.patterns[:, 0, 0]].astype(np.float64)
+        weights = self.counts.astype(np.float64)
+        blends = dict()
+        for mask in set(grid.wave.cells):
+            options = list(iter_bits(mask))
+            if not options:
+                blends[mask] = np.zeros(4)
+            else:
+                blends[mask] = np.average(first_pixels[options], axis=0, weights=weights[options])
+        pixels = np.stack([blends[mask] for mask in grid.wave.cells]).round().astype(np.uint8)
+        # Cells are in x-major order
+        pixels = pixels.reshape(grid.width, grid.height, 4).transpose(1, 0, 2)
+        image = Image.fromarray(np.ascontiguousarray(pixels), "RGBA")
+        if scale > 1:
+            image = image.resize((grid.width * scale, grid.height * scale), Image.Resampling.NEAREST)
+        return image
+
+
+def main(argv=None):
+    from app.pillow.renderer import save_image
+    from app.solver.settings import SolverConfig
+    from app.solver.solver import Solver
+    parser = argparse.ArgumentParser(description="Generate an image from the patterns of a sample image.")
+    parser.add_argument("sample", help="sample image to learn patterns from")
+    parser.add_argument("path", help="PNG or WebP image to write")
+    parser.add_argument("--n", type=int, default=3, help="width and height of the patterns, in pixels")
+    parser.add_argument("--symmetry", type=int, default=8, choices=range(1, 9),
+                        help="how many rotations and reflections of each pattern to add")
+    parser.add_argument("--no-periodic", action="store_true", help="do not read patterns across the sample's edges")
+    parser.add_argument("--width", type=int, default=48)
+    parser.add_argument("--height", type=int, default=48)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scale", type=int, default=4, help="size of a cell in the output image, in pixels")
+    parser.add_argument("--fail-condition", default="RESET", choices=["RESET", "BACKTRACK"])
+    args = parser.parse_args(argv)
+    model = OverlappingModel(args.sample, args.n, args.symmetry, not args.no_periodic)
+    print(f"{len(model.patterns)} patterns, {len(model.colors)} colors")
+    config = SolverConfig(args.sample, args.width, args.height, fail_condition=args.fail_condition,
+                          backtrack_depth=100)
+    solver = Solver(config=config, tile_set=model)
+    solver.solve(seed=args.seed)
+    print(f"Wrote {save_image(model.render(solver.grid, args.scale), args.path)} after {solver.restarts} restarts")
+
+
+if __name__ == "__main__":
+    main()
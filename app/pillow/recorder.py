@@ -0,0 +1,211 @@
+"""
+Offline recorder. Renders the collapse of a grid step by step, without a window, and encodes it to an animated GIF or
+APNG as it goes. Only the current frame is held in memory: after the first full frame, each frame covers just the
+rectangle of cells changed since the previous one, read from the grid's change journal, and is written straight to
+the file on top of the previous frames.
+
+Run from this directory:
+    python recorder.py ../../output/gifs/collapse.gif --every 4
+"""
+from app.pillow.renderer import GridRenderer
+from PIL import Image, GifImagePlugin
+import argparse
+import numpy as np
+import os
+import struct
+import zlib
+
+ANIMATION_FORMATS = {".gif": "GIF", ".png": "APNG", ".apng": "APNG"}
+
+
+class GifWriter:
+    """Writes an animated GIF one frame at a time. Each frame has its own palette of up to 256 colors."""
+    def __init__(self, path, loop=0):
+        self.file = open(path, 'wb')
+        self.loop = loop
+        self.frames = 0
+
+    def write_frame(self, image, offset=(0, 0), duration=40):
+        """Appends a frame, drawn over the previous frames at the given pixel offset.
+        Parameters:
+            duration: how long the frame is shown, in milliseconds"""
+        frame = image.convert("P", palette=Image.Palette.ADAPTIVE)
+        if not self.frames:
+            header, _ = GifImagePlugin.getheader(frame, info={"loop": self.loop, "duration": duration})
+            self.file.write(b"".join(header))
+        # Disposal 1 keeps the previous frames under this one
+        data = GifImagePlugin.getdata(frame, offset, duration=duration, disposal=1,
+                                      include_color_table=self.frames > 0)
+        self.file.write(b"".join(data))
+        self.frames += 1
+
+    def close(self):
+        self.file.write(b";")
+        self.file.close()
+
+
+class ApngWriter:
+    """Writes an animated PNG one frame at a time. Frames are lossless RGB."""
+    def __init__(self, path, loop=0):
+        self.file = open(path, 'wb')
+        self.loop = loop
+        self.frames = 0
+        self.sequence = 0
+        self.animation_control = None
+
+    def write_chunk(self, chunk_type, data):
+        self.file.write(struct.pack(">I", len(data)) + chunk_type + data)
+        self.file.write(struct.pack(">I", zlib.crc32(chunk_type + data)))
+
+    def write_frame(self, image, offset=(0, 0), duration=40):
+        """Appends a frame, drawn over the previous frames at the given pixel offset.
+        Parameters:
+            duration: how long the frame is shown, in milliseconds"""
+        width, height = image.size
+        if not self.frames:
+            self.file.write(b"\x89PNG\r\n\x1a\n")
+            self.write_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            #The frame count is only known on close, when this chunk is written again
+            self.animation_control = self.file.tell()
+            self.write_chunk(b"acTL", struct.pack(">II", 0, self.loop))
+        # Dispose op 0 keeps this frame under the next, blend op 0 replaces the pixels it covers
+        self.write_chunk(b"fcTL", struct.pack(">IIIIIHHBB", self.sequence, width, height, offset[0], offset[1],
+                                              duration, 1000, 0, 0))
+        self.sequence += 1
+        pixels = np.asarray(image.convert("RGB"))
+        # Each scanline starts with filter type 0
+        scanlines = np.concatenate([np.zeros((height, 1), dtype=np.uint8), pixels.reshape(height, width * 3)], axis=1)
+        data = zlib.compress(scanlines.tobytes(), 1)
+        if not self.frames:
+            self.write_chunk(b"IDAT", data)
+        else:
+            self.write_chunk(b"fdAT", struct.pack(">I", self.sequence) + data)
+            self.sequence += 1
+        self.frames += 1
+
+    def close(self):
+        self.write_chunk(b"IEND", b"")
+        if self.animation_control is not None:
+            self.file.seek(self.animation_control)
+            self.write_chunk(b"acTL", struct.pack(">II", self.frames, self.loop))
+        self.file.close()
+
+
+class Recorder:
+    """
+    Records the collapse of a grid to an animated GIF or APNG, chosen by the path's extension (.gif, or .png/.apng).
+    Call step after every solver step, and close once the grid is solved, or use record_solve to do both.
+    The recorder reads the grid's change journal, so it should not share a grid with a frontend that also takes the
+    grid's changes.
+    """
+    def __init__(self, grid, path, every=1, cell_size=8, duration=40, loop=0, renderer=None):
+        """
+            grid: the grid to record
+            every: a frame is written every this many steps. The changes of skipped steps are carried to the next
+                frame, so nothing is lost, only merged
+            cell_size: size of a cell in the frames, in pixels. Ignored if a renderer is given
+            duration: how long each frame is shown, in milliseconds
+            loop: how many times the animation plays. 0 loops forever
+            renderer: a GridRenderer for the grid's tiles, to reuse its prepared tile images
+            steps: number of steps since the last frame
+        """
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in ANIMATION_FORMATS:
+            raise ValueError(f"cannot record to {path}, expected one of {', '.join(ANIMATION_FORMATS)}")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.grid = grid
+        self.path = path
+        self.every = max(1, every)
+        self.duration = duration
+        self.renderer = renderer or GridRenderer(grid.all_tiles, cell_size)
+        self.writer = GifWriter(path, loop) if ANIMATION_FORMATS[extension] == "GIF" else ApngWriter(path, loop)
+        self.steps = 0
+        self.grid.enable_journal()
+        self.grid.take_changes()
+        self.write_frame(None)
+
+    @property
+    def frames(self):
+        """Number of frames written so far."""
+        return self.writer.frames
+
+    def step(self):
+        """Counts a solver step, and writes a frame of the changes since the last frame every few steps."""
+        self.steps += 1
+        if self.steps >= self.every:
+            self.write_frame(self.grid.take_changes())
+
+    def write_frame(self, changes):
+        """Writes a frame covering the given changed cells, as returned by Grid.take_changes.
+        Every cell is drawn if changes is None. Nothing is written if no cell changed."""
+        self.steps = 0
+        grid, renderer = self.grid, self.renderer
+        if changes is None:
+            self.writer.write_frame(renderer.render_grid(grid), duration=self.duration)
+            return
+        if not changes:
+            return
+        left = min(change[0] for change in changes)
+        right = max(change[0] for change in changes) + 1
+        top = min(change[1] for change in changes)
+        bottom = max(change[1] for change in changes) + 1
+        cells, height = grid.wave.cells, grid.height
+        masks = [cells[x * height + y] for x in range(left, right) for y in range(top, bottom)]
+        image = renderer.render_masks(masks, right - left, bottom - top)
+        self.writer.write_frame(image, (left * renderer.cell_width, top * renderer.cell_height), self.duration)
+
+    def close(self):
+        """Writes a last frame of any changes not yet drawn and finishes the file.
+        Returns:
+            the path written to."""
+        self.write_frame(self.grid.take_changes())
+        self.writer.close()
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def record_solve(solver, path, every=1, cell_size=8, duration=40, seed=None):
+    """Solves a solver's grid and records the collapse to path.
+    Parameters:
+        seed: if given, the grid is reseeded and reset first, so the recording depends only on the seed
+    Returns:
+        True if the grid was solved
+        False if the collapse contradicted and the fail condition ended it."""
+    if seed is not None:
+        solver.grid.set_seed(seed)
+        solver.reset()
+    with Recorder(solver.grid, path, every, cell_size, duration) as recorder:
+        while not solver.is_solved():
+            solver.solve_next()
+            recorder.step()
+    return not solver.grid.failed_collapsing
+
+
+def main(argv=None):
+    from app.solver.solver import Solver
+    from app.solver.settings import SolverConfig
+    parser = argparse.ArgumentParser(description="Record the collapse of a grid from settings.ini to a GIF or APNG.")
+    parser.add_argument("path", help="file to write, ending in .gif, .png or .apng")
+    parser.add_argument("--tile-set", default=None, help="name of a tile set folder in base_tiles")
+    parser.add_argument("--width", type=int, default=None)
+    parser.add_argument("--height", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--every", type=int, default=1, help="write a frame every this many steps")
+    parser.add_argument("--cell-size", type=int, default=8, help="size of a cell in the frames, in pixels")
+    parser.add_argument("--duration", type=int, default=40, help="how long each frame is shown, in milliseconds")
+    args = parser.parse_args(argv)
+    solver = Solver(config=SolverConfig.from_settings(tile_set_name=args.tile_set, width=args.width,
+                                                      height=args.height))
+    record_solve(solver, args.path, args.every, args.cell_size, args.duration, args.seed)
+    print(f"Wrote {args.path}")
+
+
+if __name__ == "__main__":
+    main()
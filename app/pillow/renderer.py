@@ -0,0 +1,112 @@
+"""
+Offline renderer. Draws a grid, solved or not, into a single image with Pillow and NumPy and writes it to disk.
+Each tile's image is loaded, rotated and resized once. Cells are then composited as array lookups: every distinct
+set of remaining options is averaged once, and the whole image is assembled from those blocks in a single reshape.
+"""
+import os
+import numpy as np
+from PIL import Image
+
+IMAGE_FORMATS = {".png": "PNG", ".webp": "WEBP"}
+
+
+class GridRenderer:
+    """
+    Renders grids of one tile set at a fixed cell size. Reuse one renderer for many grids of the same tile set, so the
+    tile images are only prepared once.
+    """
+    def __init__(self, tiles, cell_width, cell_height=None, background=(255, 255, 255)):
+        """
+            tiles: all tiles after permutations, in tile index order
+            cell_width, cell_height: size of a cell in the output image, in pixels
+            background: color shown through transparent parts of the tiles, and in cells with no options left
+            atlas: array of every tile's image, indexed by tile index, of shape (tiles, cell height, cell width, 3)
+            blends: mask -> index into palette of the averaged image of the tiles in that mask
+            palette: list of cell images, the first being the background
+        """
+        self.tiles = list(tiles)
+        self.cell_width = cell_width
+        self.cell_height = cell_height or cell_width
+        self.background = background
+        self.atlas = np.stack([self.load_tile(tile) for tile in self.tiles])
+        self.blends = dict()
+        self.palette = [np.empty((self.cell_height, self.cell_width, 3), dtype=np.uint8)]
+        self.palette[0][:] = background
+
+    def load_tile(self, tile):
+        """Returns a tile's image as an array, rotated, resized to the cell size and flattened onto the background."""
+        image = Image.open(tile.image_path).convert("RGBA")
+        for _ in range(tile.rotations % 4):
+            image = image.transpose(Image.Transpose.ROTATE_270)
+        image = image.resize((self.cell_width, self.cell_height))
+        flattened = Image.new("RGBA", image.size, self.background + (255,))
+        flattened.alpha_composite(image)
+        return np.asarray(flattened.convert("RGB"))
+
+    def palette_index(self, mask):
+        """Returns the index in the palette of the image of a cell with the given options, averaging it if needed."""
+        index = self.blends.get(mask)
+        if index is None:
+            if not mask:
+                index = 0
+            else:
+                options = [i for i in range(mask.bit_length()) if mask >> i & 1]
+                blend = self.atlas[options[0]] if len(options) == 1 \
+                    else self.atlas[options].mean(axis=0).round().astype(np.uint8)
+                index = len(self.palette)
+                self.palette.append(blend)
+            self.blends[mask] = index
+        return index
+
+    def render_masks(self, masks, width, height):
+        """Renders cells given as domain masks in x-major order, as held by Wave.cells.
+        Returns:
+            the rendered Image"""
+        palette_index = self.palette_index
+        indexes = np.fromiter((palette_index(mask) for mask in masks), dtype=np.intp, count=width * height)
+        # Only stack the cell images this render uses, so small renders stay cheap however large the palette grows
+        used, indexes = np.unique(indexes, return_inverse=True)
+        cells = np.stack([self.palette[i] for i in used])[indexes.reshape(width, height)]
+        # (x, y, row, column, channel) -> (y, row, x, column, channel)
+        pixels = cells.transpose(1, 2, 0, 3, 4).reshape(height * self.cell_height, width * self.cell_width, 3)
+        return Image.fromarray(pixels, "RGB")
+
+    def render_tile_indexes(self, tile_indexes, width, height):
+        """Renders cells given as tile indexes in x-major order, as returned by Wave.tile_indexes. Cells of -1 are
+        left as background."""
+        return self.render_masks([1 << i if i >= 0 else 0 for i in tile_indexes], width, height)
+
+    def render_grid(self, grid):
+        """Renders the current state of a grid. Cells that are not collapsed show the average of their options."""
+        return self.render_masks(grid.wave.cells, grid.width, grid.height)
+
+
+def save_image(image, path):
+    """Writes an image to a path, as PNG or WebP depending on its extension.
+    Returns:
+        the path written to."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in IMAGE_FORMATS:
+        raise ValueError(f"cannot write {path}, expected one of {', '.join(IMAGE_FORMATS)}")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if IMAGE_FORMATS[extension] == "PNG":
+        image.save(path, "PNG", compress_level=1)
+    else:
+        image.save(path, "WEBP", lossless=True, method=0)
+    return path
+
+
+def render_grid(grid, path=None, cell_size=16, renderer=None):
+    """Renders a grid, and writes it to path if given.
+    Parameters:
+        cell_size: size of a cell in pixels. Ignored if a renderer is given
+        renderer: a GridRenderer for the grid's tiles, to reuse its prepared tile images
+    Returns:
+        the rendered Image"""
+    renderer = renderer or GridRenderer(grid.all_tiles, cell_size)
+    image = renderer.render_grid(grid)
+    if path is not None:
+        save_image(image, path)
+    return image
@@ -0,0 +1,52 @@
+from collections import OrderedDict
+import pygame
+
+
+class SpriteImageCache:
+    """
+    Images shared by every NodeSprite of a frontend.
+    Each tile's image is loaded from disk, scaled to the sprite size and rotated once. The averaged image of a
+    superposition is built once per set of remaining options and kept in a least recently used cache, so cells in the
+    same partial state share one surface.
+    """
+    def __init__(self, width, height, max_superpositions=4096):
+        """
+            width, height: size of a sprite on the screen
+            tile_images: (image path, rotations) -> the tile's image, scaled and rotated
+            superpositions: most recently used averaged images, keyed by the mask of the options they show.
+                Masks index the tiles of one wave, so a cache is only shared by grids of the same tile set
+            max_superpositions: how many averaged images are kept
+        """
+        self.width = width
+        self.height = height
+        self.tile_images = dict()
+        self.superpositions = OrderedDict()
+        self.max_superpositions = max_superpositions
+
+    def tile_image(self, tile):
+        """Returns the image of a single tile, scaled to the sprite size and rotated."""
+        key = (tile.image_path, tile.rotations)
+        image = self.tile_images.get(key)
+        if image is None:
+            image = pygame.image.load(tile.image_path).convert_alpha()
+            image = pygame.transform.scale(image, (self.width, self.height))
+            image = pygame.transform.rotate(image, -90 * tile.rotations)
+            self.tile_images[key] = image
+        return image
+
+    def node_image(self, node):
+        """Returns the image of a node: the average of the images of all its remaining options.
+        Returns None if the node has no options left."""
+        mask = node.get_tile_mask()
+        if not mask:
+            return None
+        image = self.superpositions.get(mask)
+        if image is not None:
+            self.superpositions.move_to_end(mask)
+            return image
+        images = [self.tile_image(tile) for tile in node.get_tile_options()]
+        image = images[0] if len(images) == 1 else pygame.transform.average_surfaces(images)
+        self.superpositions[mask] = image
+        if len(self.superpositions) > self.max_superpositions:
+            self.superpositions.popitem(last=False)
+        return image
@@ -1,5 +1,6 @@
 
 import pygame
+from app.pygame_frontend.image_cache import SpriteImageCache
 
 
 class NodeSprite(pygame.sprite.Sprite):
@@ -18,14 +19,16 @@ class NodeSprite(pygame.sprite.Sprite):
                 - Reduce options to empty set
                 - Mark as collapsed
     """
-    def __init__(self, i, j, node, width, height, debug=False):
+    def __init__(self, i, j, node, width, height, debug=False, image_cache=None):
         """Visual representation of a node.
         State:
             node: reference to a node
             x, y: coordinate on the screen given screen and grid dimensions
             sprite_width, sprite_height: size of the sprite on the screen
-            images: list of potential images representing the node. Once collapsed, list will be length = 1
-            image: average image given list of all images
+            image_cache: images shared with the other sprites of the frontend. An image cache of its own is made if
+                not given
+            image: average image of all the node's potential images. Once collapsed, the image of its tile.
+                Blank if the node has no options left
             rect: rectangle around the visual for rendering purposes
             rect.center: center of the visual for rendering purposes"""
         super().__init__()
@@ -39,16 +42,12 @@ class NodeSprite(pygame.sprite.Sprite):
         self.sprite_height = height
 
         #All possible image states
-        self.images = []
-        for tile_option in node.get_tile_options():
-            image = pygame.image.load(tile_option.image_path).convert_alpha()
-            image = pygame.transform.scale(image, (self.sprite_width, self.sprite_height))
-            image = pygame.transform.rotate(image, -90 * tile_option.rotations)
-            self.images.append(image)
-        self.image = pygame.transform.average_surfaces(self.images)
+        self.image_cache = image_cache or SpriteImageCache(width, height)
+        self.image = self.image_cache.node_image(node)
+        if self.image is None: self.image = pygame.Surface((width, height))
 
         #Positioning
-        self.rect = self.images[0].get_rect()
+        self.rect = self.image.get_rect()
         self.rect.center = (self.x, self.y)
 
     def update(self):
@@ -58,17 +57,12 @@ class NodeSprite(pygame.sprite.Sprite):
              None
         """
         if self.node.get_reset_updated():
-            if len(self.node.tile_options) == 0: return
-            self.images = []
-            for tile_option in self.node.tile_options:
-                image = pygame.image.load(tile_option.image_path).convert_alpha()
-                image = pygame.transform.scale(image, (self.sprite_width, self.sprite_height))
-                image = pygame.transform.rotate(image, -90 * tile_option.rotations)
-                self.images.append(image)
-            self.image = pygame.transform.average_surfaces(self.images)
+            image = self.image_cache.node_image(self.node)
+            if image is None: return
+            self.image = image
 
             #Positioning
-            self.rect = self.images[0].get_rect()
+            self.rect = self.image.get_rect()
             self.rect.center = (self.x, self.y)
 
     def draw(self, surface):
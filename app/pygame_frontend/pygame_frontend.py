@@ -6,18 +6,21 @@ import pygame
 import sys
 from pygame.locals import *
 from app.solver.solver import Solver
+from app.solver.settings import read_settings
 from app.solver.node import Node
+from app.solver.profiling import Profiler, format_stats
 from app.pygame_frontend.nodesprite import NodeSprite
-import configparser
+from app.pygame_frontend.image_cache import SpriteImageCache
 
 
 class PygameFrontEnd:
     def __init__(self):
         #Load configuration
-        config = configparser.ConfigParser()
-        config.read("../../settings.ini")
+        config = read_settings()
         self.debug = config.getboolean('debug', 'DEBUG')
         self.solved = False
+        #Profiles the solve and rendering until the grid is solved, then prints where the time went
+        self.profiler = Profiler(memory=True) if config.getboolean('debug', 'PROFILE', fallback=False) else None
 
         #Initialize pygame settings
         pygame.init()
@@ -30,8 +33,14 @@ class PygameFrontEnd:
         self.fps = int(config['pygame']['FPS'])
 
         #Initialize grid, sprites, tiles, and prepare for solving
-        self.solver = Solver(debug=self.debug)
-        self.sprite_group = self.setup_sprites(self.solver.get_grid(), self.screen_width, self.screen_height)
+        self.solver = Solver(debug=self.debug, config=config)
+        grid = self.solver.get_grid()
+        self.image_cache = SpriteImageCache(self.screen_width // len(grid), self.screen_height // len(grid[0]))
+        self.sprite_group = None
+        self.sprites = []
+        self.redraw = True
+        self.dirty_rects = []
+        self.reset_sprites()
 
 
     def setup_sprites(self, grid: List[List[Node]], width, height) -> pygame.sprite.Group:
@@ -42,32 +51,87 @@ class PygameFrontEnd:
         sprites = pygame.sprite.Group()
         for i, row in enumerate(grid):
             for j, node in enumerate(row):
-                sprites.add(NodeSprite(i, j, node, sprite_width, sprite_height, debug=self.debug))
+                sprites.add(NodeSprite(i, j, node, sprite_width, sprite_height, debug=self.debug,
+                                       image_cache=self.image_cache))
         return sprites
 
+    def reset_sprites(self):
+        """Rebuilds every sprite for the solver's current grid, and schedules a full redraw.
+        Sprites are also kept in a flat list in cell index order, so that later steps only redraw the sprites of the
+        cells the grid's change journal reports."""
+        grid = self.solver.get_grid()
+        self.sprite_group = self.setup_sprites(grid, self.screen_width, self.screen_height)
+        self.sprites = [None] * (len(grid) * len(grid[0]))
+        for sprite in self.sprite_group:
+            self.sprites[sprite.node.index] = sprite
+        self.solver.grid.enable_journal()
+        self.solver.grid.take_changes()
+        self.redraw = True
+        self.dirty_rects = []
+
+    def render_changes(self):
+        """Updates and blits only the sprites of the cells changed since the last render, and remembers the
+        rectangles they cover so only those are pushed to the display."""
+        changes = self.solver.grid.take_changes()
+        if changes is None:
+            self.sprite_group.update()
+            self.redraw = True
+            return
+        wave = self.solver.grid.wave
+        for x, y in changes:
+            sprite = self.sprites[wave.index(x, y)]
+            sprite.update()
+            self.display_surf.blit(sprite.image, sprite.rect)
+            self.dirty_rects.append(sprite.rect.copy())
+
+    def update_display(self):
+        """Pushes the frame to the display: the whole window after a full redraw, otherwise only the rectangles of
+        the sprites which changed."""
+        if self.redraw:
+            self.sprite_group.draw(self.display_surf)
+            pygame.display.flip()
+            self.redraw = False
+        elif self.dirty_rects:
+            pygame.display.update(self.dirty_rects)
+        self.dirty_rects = []
+
     def solve_wave(self):
         #Solve the wave
         print("Solving...")
+        if self.profiler is not None:
+            self.profiler.start()
         while True:
             for event in pygame.event.get():
                 if event.type == QUIT:
+                    self.report_profile()
                     pygame.quit()
                     sys.exit()
             if not self.solved:
                 self.solve_next()
+                if self.solved:
+                    self.report_profile()
 
             #Update gui after each step
             self.frame_per_sec.tick(self.fps)
-            pygame.display.flip()
+            with self.solver.grid.stats.timer("render"):
+                self.update_display()
+
+    def report_profile(self):
+        """Stops profiling, if enabled, and prints the solver's stats and the profile."""
+        if self.profiler is None or self.profiler.start_time is None:
+            return
+        self.profiler.stop()
+        print(format_stats(self.solver.stats()))
+        print(self.profiler.report())
 
     def solve_next(self):
         if not self.solver.is_solved():
             if self.solver.solve_next():
-                self.sprite_group.update()
-                self.sprite_group.draw(self.display_surf)
-            elif self.solver.fail_condition == "RESET" or self.solver.fail_condition == "RESET_FROM_FAIL":
-                self.sprite_group = self.setup_sprites(self.solver.get_grid(),
-                                                       self.screen_width, self.screen_height)
+                with self.solver.grid.stats.timer("render"):
+                    self.render_changes()
+            elif self.solver.fail_condition in ("RESET", "RESET_FROM_FAIL", "BACKTRACK"):
+                with self.solver.grid.stats.timer("render"):
+                    self.reset_sprites()
         else:
             self.solved = True
             if self.debug: print("Solved!")
@@ -0,0 +1,104 @@
+from array import array
+import hashlib
+import json
+import os
+
+
+def content_hash(filepath):
+    """Returns the sha256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    On-disk cache of solved grids, so a request that has been solved before is answered without solving it again.
+    A solved grid is stored as a compact array of its tile indexes, in a file named by the hash of everything that
+    determines the result: the tile set's contents, the grid's dimensions, constraints and solver options, and the seed.
+    When the cache grows past max_bytes, the least recently used grids are evicted.
+    """
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024):
+        """
+            directory: folder the cached grids are written to. Created if it does not exist
+            max_bytes: total size of cached grids to keep
+            hits, misses: lookups answered and not answered by the cache
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(grid, seed, fail_condition=None):
+        """Returns the cache key of solving a freshly reset grid with the given seed."""
+        constraints = sorted((tile.id, tile.rotations, sorted(coordinates))
+                             for tile, coordinates in grid.constraints.items())
+        region_constraints = [(region, sorted((tile.id, tile.rotations) for tile in tiles))
+                              for region, tiles in grid.region_constraints]
+        description = json.dumps({
+            "tile_set": grid.tile_set_hash,
+            # The tiles the cached tile indexes refer to, after rotations were permuted and merged
+            "tiles": [(tile.id, tile.rotations, tile.weight) for tile in grid.all_tiles],
+            "width": grid.width,
+            "height": grid.height,
+            "wrap": grid.wrap,
+            "directions": grid.directions,
+            "constraints": constraints,
+            "region_constraints": region_constraints,
+            "propagation_engine": grid.propagation_engine,
+            "entropy_heuristic": grid.entropy_heuristic,
+            "backtrack_depth": grid.backtrack_depth,
+            "fail_condition": fail_condition,
+            "seed": seed,
+        }, default=str)
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.bin")
+
+    def get(self, key):
+        """Returns the cached tile indexes for a key, or None if the grid is not cached."""
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        # Touch the file so eviction treats it as recently used
+        os.utime(path)
+        self.hits += 1
+        tile_indexes = array('i')
+        tile_indexes.frombytes(data)
+        return tile_indexes.tolist()
+
+    def put(self, key, tile_indexes):
+        """Stores a solved grid's tile indexes under a key, then evicts old grids if the cache is too large."""
+        path = self.path(key)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'wb') as file:
+            file.write(array('i', tile_indexes).tobytes())
+        # Replacing is atomic, so other processes sharing the cache never read a half written grid
+        os.replace(temporary_path, path)
+        self.evict()
+
+    def evict(self):
+        """Deletes the least recently used grids until the cache fits in max_bytes."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.bin'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
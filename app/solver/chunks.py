@@ -0,0 +1,134 @@
+from app.solver.grid import Grid
+from app.solver.wave import DIRECTION_OFFSETS, OPPOSITE_DIRECTIONS
+from collections import OrderedDict
+
+
+class ChunkedWorld:
+    """
+    An unbounded world, generated lazily one fixed-size chunk at a time.
+    A chunk is solved on a grid that does not wrap, with the cells along each edge constrained by the facing edge of
+    any neighboring chunk that has already been solved, so the seams between chunks are valid.
+    Only the most recently used chunks are kept in memory. The edges of many more chunks are kept, so an evicted chunk
+    is regenerated with the same edges and its seams stay stable, though its interior may differ. Memory stays bounded
+    because edges are evicted too, least recently used first: a chunk regenerated after its edges were evicted still
+    fits the neighbors in memory, but its seams with chunks evicted before it may differ from when they were solved.
+    Chunks depend on which of their neighbors already existed, so a world is only reproducible when its chunks are
+    requested in the same order.
+    """
+    def __init__(self, tile_set_filepath, chunk_width, chunk_height, directions, seed=0, max_chunks=64,
+                 max_attempts=10, debug=False, propagation_engine="AC3", entropy_heuristic="COUNT",
+                 backtrack_depth=0, max_edges=4096):
+        """
+            grid: a grid which does not wrap, reused to solve every chunk. Tile set constraints and region
+                constraints are placed in grid coordinates, so they are not applied to the chunks.
+            seed: seed of the world. Each chunk is solved with a seed derived from it and the chunk's coordinates
+            max_chunks: how many solved chunks are kept in memory
+            max_edges: how many chunks' edges are kept in memory. Never fewer than max_chunks, so every chunk in
+                memory has its edges kept
+            max_attempts: how many times a chunk is reset before giving up on it
+            chunks: the most recently used chunks, as (chunk x, chunk y) -> tile indexes in Wave.tile_indexes order
+            edges: for the most recently used chunks, direction -> tile indexes along that edge
+            edge_cells: direction -> indexes of the cells along that edge of a chunk, in the same order as edges
+        """
+        self.grid = Grid(tile_set_filepath, chunk_width, chunk_height, directions, debug=debug,
+                         propagation_engine=propagation_engine, entropy_heuristic=entropy_heuristic,
+                         backtrack_depth=backtrack_depth, wrap=False)
+        self.grid.constraints = dict()
+        self.grid.region_constraints = []
+        self.grid.reset(rebuild=True)
+        self.chunk_width = chunk_width
+        self.chunk_height = chunk_height
+        self.seed = seed
+        self.max_chunks = max_chunks
+        self.max_edges = max(max_edges, max_chunks)
+        self.max_attempts = max_attempts
+        self.debug = debug
+        self.chunks = OrderedDict()
+        self.edges = OrderedDict()
+        self.edge_cells = {direction: [index for index, other in enumerate(self.grid.wave.neighbors[direction])
+                                       if other < 0] for direction in directions}
+
+    #Get/set
+    def get_tiles(self):
+        """Returns the tiles that the tile indexes of a chunk refer to."""
+        return self.grid.all_tiles
+
+    def get_chunk(self, cx, cy):
+        """Returns the tile indexes of the chunk at chunk coordinates (cx, cy), solving it if it is not in memory.
+        Tile indexes are in x-major order, as returned by Wave.tile_indexes."""
+        chunk = self.chunks.get((cx, cy))
+        if chunk is not None:
+            self.chunks.move_to_end((cx, cy))
+            # Edges are used in the same order as chunks, so they outlive every chunk still in memory
+            self.edges.move_to_end((cx, cy))
+            return chunk
+        chunk = self.solve_chunk(cx, cy)
+        self.chunks[(cx, cy)] = chunk
+        if len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+        return chunk
+
+    def generate(self, coordinates):
+        """Solves the chunks at the given chunk coordinates in order, yielding each one as soon as it is finished.
+        Parameters:
+            coordinates: iterable of (cx, cy). It may be unbounded.
+        Yields:
+            ((cx, cy), tile indexes of the chunk)"""
+        for cx, cy in coordinates:
+            yield (cx, cy), self.get_chunk(cx, cy)
+
+    def tile_at(self, x, y):
+        """Returns the tile at world coordinates (x, y), solving its chunk if needed."""
+        cx, local_x = divmod(x, self.chunk_width)
+        cy, local_y = divmod(y, self.chunk_height)
+        chunk = self.get_chunk(cx, cy)
+        return self.grid.all_tiles[chunk[self.grid.wave.index(local_x, local_y)]]
+
+    #Solving
+    def seam_masks(self, cx, cy):
+        """Returns the constraints on the chunk at (cx, cy) from the edges of the chunks around it, as a dict of
+        cell index -> mask. A chunk being regenerated is also pinned to its own previous edges."""
+        masks = dict()
+        for direction, cells in self.edge_cells.items():
+            dx, dy = DIRECTION_OFFSETS[direction]
+            neighbor_edges = self.edges.get((cx + dx, cy + dy))
+            if neighbor_edges is None:
+                continue
+            # Our cell sits in the opposite direction of the neighbor's facing tile
+            table = self.grid.propagator.masks[OPPOSITE_DIRECTIONS[direction]]
+            for index, tile_index in zip(cells, neighbor_edges[OPPOSITE_DIRECTIONS[direction]]):
+                masks[index] = masks.get(index, self.grid.wave.full_mask) & table[tile_index]
+        own_edges = self.edges.get((cx, cy))
+        if own_edges is not None:
+            for direction, cells in self.edge_cells.items():
+                for index, tile_index in zip(cells, own_edges[direction]):
+                    masks[index] = masks.get(index, self.grid.wave.full_mask) & (1 << tile_index)
+        return masks
+
+    def solve_chunk(self, cx, cy):
+        """Solves the chunk at (cx, cy) against its neighbors' edges and records its own edges.
+        Returns:
+            tile indexes of the chunk
+        Raises:
+            RuntimeError if the chunk could not be solved in max_attempts attempts."""
+        grid = self.grid
+        grid.set_seed(f"{self.seed}:{cx}:{cy}")
+        masks = self.seam_masks(cx, cy)
+        for attempt in range(self.max_attempts):
+            grid.reset()
+            if not grid.restrict(masks):
+                break
+            while not grid.finished_collapsing:
+                grid.collapse_node()
+                if grid.failed_collapsing and not (grid.backtrack_depth > 0 and grid.backtrack()):
+                    break
+            if not grid.failed_collapsing:
+                tile_indexes = grid.wave.tile_indexes()
+                self.edges[(cx, cy)] = {direction: [tile_indexes[index] for index in cells]
+                                        for direction, cells in self.edge_cells.items()}
+                self.edges.move_to_end((cx, cy))
+                if len(self.edges) > self.max_edges:
+                    self.edges.popitem(last=False)
+                return tile_indexes
+            if self.debug: print(f"chunk ({cx},{cy}) failed attempt {attempt + 1}")
+        raise RuntimeError(f"could not solve chunk ({cx},{cy}) against its neighbors")
@@ -0,0 +1,113 @@
+"""
+Compiled tile sets. Parsing a tile set, permuting its tiles and deriving every tile's valid neighbors is repeated by
+every grid built from it, so the result is compiled once into a binary file next to the tile set's JSON and loaded
+from there afterwards. The compiled file is rebuilt whenever the JSON, any of its images or the directions change.
+
+To compile tile sets ahead of time:
+    python compiled_tileset.py circles grass_tiles
+"""
+from app.solver.tile import Tile
+from app.solver.propagator import Propagator
+from app.solver.wave import iter_bits
+import hashlib
+import marshal
+import os
+import sys
+
+COMPILED_VERSION = 4
+
+
+def compiled_path(tile_set_filepath):
+    """Returns the path of the compiled file for a tile set's JSON."""
+    return f"{os.path.splitext(tile_set_filepath)[0]}.compiled"
+
+
+def tileset_hash(tile_set_filepath, image_names, directions):
+    """Returns a hash of the tile set's JSON, the images it references and the directions it is compiled for."""
+    digest = hashlib.sha256(f"{COMPILED_VERSION}:{','.join(directions)}".encode())
+    with open(tile_set_filepath, 'rb') as file:
+        digest.update(file.read())
+    folder = os.path.dirname(tile_set_filepath)
+    for image_name in sorted(set(image_names)):
+        digest.update(image_name.encode())
+        try:
+            with open(os.path.join(folder, image_name), 'rb') as file:
+                digest.update(file.read())
+        except FileNotFoundError:
+            digest.update(b'missing')
+    return digest.hexdigest()
+
+
+def write_compiled_tileset(tile_set_filepath, directions, tiles, constraints, region_constraints, propagator):
+    """Writes the permuted tiles, their adjacency masks and the grid constraints of a tile set to its compiled file.
+    Parameters:
+        tiles: all tiles after permutations, in tile index order
+        constraints: dict of tile -> list of coordinates, as built by Grid.add_constraint
+        region_constraints: list of (region, tiles), as built by Grid.add_region_constraint
+        propagator: the propagator compiled from the tiles' valid neighbors"""
+    tile_index = {tile: i for i, tile in enumerate(tiles)}
+    image_names = [os.path.basename(tile.image_path) for tile in tiles]
+    data = {
+        "version": COMPILED_VERSION,
+        "hash": tileset_hash(tile_set_filepath, image_names, directions),
+        "directions": list(directions),
+        "tiles": [(tile.id, image_name, dict(tile.sides), tile.rotations, tile.weight, tile.symmetry)
+                  for tile, image_name in zip(tiles, image_names)],
+        "masks": {direction: list(propagator.masks[direction]) for direction in directions},
+        "constraints": [(tile_index[tile], [tuple(coordinate) for coordinate in coordinates])
+                        for tile, coordinates in constraints.items()],
+        "regions": [(dict(region), [tile_index[tile] for tile in region_tiles])
+                    for region, region_tiles in region_constraints],
+    }
+    path = compiled_path(tile_set_filepath)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'wb') as file:
+        marshal.dump(data, file)
+    os.replace(temporary_path, path)
+    return path
+
+
+def load_compiled_tileset(tile_set_filepath, directions):
+    """Loads a tile set from its compiled file.
+    Returns:
+        (all tiles, constraints, region constraints, propagator) ready for a grid, or None if the compiled file is missing or stale."""
+    try:
+        with open(compiled_path(tile_set_filepath), 'rb') as file:
+            data = marshal.load(file)
+    except (FileNotFoundError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != COMPILED_VERSION \
+            or data.get("directions") != list(directions):
+        return None
+    image_names = [tile[1] for tile in data["tiles"]]
+    if data["hash"] != tileset_hash(tile_set_filepath, image_names, directions):
+        return None
+
+    folder = os.path.dirname(tile_set_filepath)
+    tiles = [Tile(ext_id=ext_id, image_path=os.path.join(folder, image_name), sides=sides, rotations=rotations,
+                  weight=weight, symmetry=symmetry)
+             for ext_id, image_name, sides, rotations, weight, symmetry in data["tiles"]]
+    masks = data["masks"]
+    for i, tile in enumerate(tiles):
+        tile.valid_neighbors = {direction: {tiles[j] for j in iter_bits(masks[direction][i])}
+                                for direction in directions}
+    constraints = {tiles[i]: list(coordinates) for i, coordinates in data["constraints"]}
+    region_constraints = [(region, [tiles[i] for i in indexes]) for region, indexes in data["regions"]]
+    return tiles, constraints, region_constraints, Propagator(tiles, directions, masks=masks)
+
+
+def main(argv=None):
+    """Compiles the named tile sets, replacing any compiled files they already have."""
+    from app.solver.grid import Grid
+    from app.solver.settings import SolverConfig
+    for tile_set_name in (argv if argv is not None else sys.argv[1:]):
+        config = SolverConfig.from_settings(tile_set_name=tile_set_name)
+        tile_set_filepath = config.tile_set_filepath
+        if os.path.exists(compiled_path(tile_set_filepath)):
+            os.remove(compiled_path(tile_set_filepath))
+        grid = Grid(tile_set_filepath, config.width, config.height, config.directions)
+        print(f"compiled {tile_set_name}: {len(grid.all_tiles)} tiles -> {compiled_path(tile_set_filepath)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import heapq
+import math
+from app.solver.wave import iter_bits
+
+
+class EntropyIndex:
+    """
+    Keeps track of which uncollapsed cells of a wave have the lowest entropy, without scanning the whole grid.
+    Cells are kept in a heap keyed by entropy. When a cell's domain changes a new entry is pushed, and the cell's
+    older entries are invalidated lazily by a per-cell version number.
+    Ties are broken by a random number drawn from the wave's rng when the entry is pushed, so every cell tied for the
+    lowest entropy is equally likely to be chosen.
+    """
+    def __init__(self, wave):
+        """
+            wave: the wave being indexed. The index registers itself as an observer of the wave.
+            heap: entries of (entropy, tie break, cell index, version)
+            versions: current version of each cell. Entries with an older version are stale.
+        """
+        self.wave = wave
+        self.heap = []
+        self.versions = [0] * wave.size
+        wave.observers.append(self)
+        self.wave_reset()
+
+    def entropy(self, index):
+        """Returns the entropy of a cell, here its number of remaining options."""
+        return self.wave.cells[index].bit_count()
+
+    def wave_reset(self):
+        """Rebuilds the heap from the current state of the wave."""
+        collapsed, random = self.wave.collapsed, self.wave.rng.random
+        self.versions = [version + 1 for version in self.versions]
+        self.heap = [(self.entropy(index), random(), index, self.versions[index])
+                     for index in range(self.wave.size) if not collapsed[index]]
+        heapq.heapify(self.heap)
+
+    def cell_changed(self, index, old_mask):
+        """Called by the wave whenever a cell's domain changes."""
+        self.versions[index] += 1
+        if not self.wave.collapsed[index]:
+            heapq.heappush(self.heap, (self.entropy(index), self.wave.rng.random(), index, self.versions[index]))
+            if len(self.heap) > 4 * self.wave.size + 64:
+                self.wave_reset()
+
+    def lowest(self):
+        """Returns the index of a cell with the lowest entropy, chosen at random among ties, or None if every
+        cell is collapsed."""
+        heap, versions = self.heap, self.versions
+        while heap:
+            entry = heap[0]
+            if entry[3] == versions[entry[2]]:
+                return entry[2]
+            heapq.heappop(heap)
+        return None
+
+    def lowest_all(self):
+        """Returns the indexes of every cell tied for the lowest entropy."""
+        heap, versions = self.heap, self.versions
+        lowest = self.lowest()
+        if lowest is None:
+            return []
+        lowest_entropy = heap[0][0]
+        popped, indexes = [], []
+        while heap and heap[0][0] == lowest_entropy:
+            entry = heapq.heappop(heap)
+            if entry[3] == versions[entry[2]]:
+                popped.append(entry)
+                indexes.append(entry[2])
+        for entry in popped:
+            heapq.heappush(heap, entry)
+        return indexes
+
+
+class WeightedEntropyIndex(EntropyIndex):
+    """
+    Entropy index keyed by the Shannon entropy of each cell's remaining options, weighted by tile weight:
+        H = log(sum(w)) - sum(w * log(w)) / sum(w)
+    The sums are kept per cell and updated incrementally as tiles are banned, rather than recomputed from the
+    cell's whole domain.
+    """
+    def __init__(self, wave):
+        """
+            weight_sums: sum(w) of each cell's remaining options
+            weight_log_weight_sums: sum(w * log(w)) of each cell's remaining options
+        """
+        self.weight_sums = []
+        self.weight_log_weight_sums = []
+        super().__init__(wave)
+
+    def entropy(self, index):
+        """Returns the weighted Shannon entropy of a cell. Cells with no options come first. Cells whose options all
+        weigh 0 have no defined entropy, so fall back to their number of options, as EntropyIndex does."""
+        if not self.wave.cells[index]:
+            return -1.0
+        weight_sum = self.weight_sums[index]
+        if weight_sum <= 0:
+            return float(self.wave.cells[index].bit_count())
+        return round(math.log(weight_sum) - self.weight_log_weight_sums[index] / weight_sum, 9)
+
+    def wave_reset(self):
+        """Recomputes every cell's sums, then rebuilds the heap."""
+        weights, cells = self.wave.weights, self.wave.cells
+        sums = dict()
+        for mask in set(cells):
+            sums[mask] = (sum(weights.weights[i] for i in iter_bits(mask)),
+                          sum(weights.weight_log_weights[i] for i in iter_bits(mask)))
+        self.weight_sums = [sums[mask][0] for mask in cells]
+        self.weight_log_weight_sums = [sums[mask][1] for mask in cells]
+        super().wave_reset()
+
+    def cell_changed(self, index, old_mask):
+        """Updates the cell's sums with the tiles removed from (or restored to) it, then re-indexes it."""
+        weights = self.wave.weights
+        new_mask = self.wave.cells[index]
+        weight_sum, weight_log_weight_sum = self.weight_sums[index], self.weight_log_weight_sums[index]
+        for i in iter_bits(old_mask & ~new_mask):
+            weight_sum -= weights.weights[i]
+            weight_log_weight_sum -= weights.weight_log_weights[i]
+        for i in iter_bits(new_mask & ~old_mask):
+            weight_sum += weights.weights[i]
+            weight_log_weight_sum += weights.weight_log_weights[i]
+        self.weight_sums[index], self.weight_log_weight_sums[index] = weight_sum, weight_log_weight_sum
+        super().cell_changed(index, old_mask)
+
+
+ENTROPY_HEURISTICS = {"COUNT": EntropyIndex, "SHANNON": WeightedEntropyIndex}
@@ -1,53 +1,138 @@
-import random
-from app.solver.tile import Tile
+from app.solver.tile import Tile, set_all_valid_neighbors
 from app.solver.node import Node
+from app.solver.wave import Wave
+from app.solver.entropy import ENTROPY_HEURISTICS
+from app.solver.propagator import Propagator, PROPAGATION_ENGINES
+from app.solver.cache import content_hash
+from app.solver.compiled_tileset import load_compiled_tileset, write_compiled_tileset
+from app.solver.journal import ChangeJournal
+from app.solver.regions import region_cells, region_tiles
+from app.solver.stats import SolverStats
+from collections import deque
 import json
+import os
+import random
+import time
 
 
 class Grid:
     """
     A collection of data used for solving a wave function collapse problem.
     """
-    def __init__(self, tile_set_filepath, width, height, directions, debug=False):
+    def __init__(self, tile_set_filepath, width, height, directions, debug=False, propagation_engine="AC3",
+                 entropy_heuristic="COUNT", backtrack_depth=0, wrap=True, seed=None,
+                 compile_tileset=True, tile_set=None):
         """
         Instance of a grid used for wave function collapse
             finished_collapsing: Whether the grid has been collapsed or not
             grid: the 2d grid of nodes representing the wave
+            wave: bitmask state of every node. The nodes in grid are views onto it
+            propagator: per-direction masks of compatible tiles, compiled from the tiles' valid neighbors
+            engine: propagation engine narrowing the wave, chosen by name from PROPAGATION_ENGINES
+            entropy: index of the uncollapsed nodes with the lowest entropy, kept up to date as the wave changes.
+                Chosen by name from ENTROPY_HEURISTICS
+            failed_node: the node a contradiction was found in, if any
+            backtrack_depth: how many of the most recent decisions can be undone on a contradiction. 0 disables
+                backtracking, and the wave does not record a trail of its changes.
+            decisions: the most recent decisions as (trail mark, cell index, chosen tile index)
+            backtracks: number of decisions undone since the grid was last reset
             width, height: dimensions of the 2d grid
+            wrap: whether the grid wraps around at the edges. Grids that do not wrap leave their edges unconstrained
             all_tiles: set of all tiles after permutations
+            base_tiles: tiles as read from the tile set file, before permutations. None when the tile set was loaded
+                from its compiled file
+            merged_tiles: how many rotations were merged into an identical rotation of the same tile. None when the
+                tile set was not parsed here, as when it was loaded from its compiled file
+            compile_tileset: whether to load the tile set from its compiled file, and write that file when it is
+                missing or stale
+            region_constraints: list of (region, tiles) limiting whole regions of the grid to some tiles. See
+                regions.py
+            tile_set_hash: hash of the tile set file's contents, identifying the tile set in the result cache
+            tile_set: a tile set built elsewhere, such as an OverlappingModel, used instead of reading
+                tile_set_filepath. Anything with tiles, constraints, propagator and hash attributes
+            seed: seed the grid's random number generator was last seeded with. None seeds it unpredictably
+            journal: records the cells changed by each step once enabled with enable_journal, otherwise None
+            initial_state: snapshot of the wave and propagation engine once the constraints are applied, restored by
+                reset. None until the grid is first built, and after the constraints change
+            stats: SolverStats of the work done on this grid, shared with its propagation engine and kept across resets
+            rng: source of every random choice made while solving this grid. Resetting the grid does not reseed it,
+                so each attempt after a contradiction makes different choices, but the whole run is reproducible
         """
         self.finished_collapsing = False
         self.constraints = dict()
-        self.base_tiles, constraints = import_tileset(tile_set_filepath)
-        self.all_tiles = self.permute_tiles(constraints)
+        self.region_constraints = []
         self.width = width
         self.height = height
-        self.grid = self.set_new_grid()
         self.debug = debug
         self.directions = directions
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.base_tiles = None
+        self.merged_tiles = None
+        if tile_set is not None:
+            self.tile_set_hash = tile_set.hash
+            self.all_tiles = list(tile_set.tiles)
+            self.constraints = dict(tile_set.constraints)
+            self.region_constraints = list(getattr(tile_set, "region_constraints", ()))
+            self.propagator = tile_set.propagator
+        else:
+            self.tile_set_hash = content_hash(tile_set_filepath)
+            self.all_tiles = None
+            self.propagator = None
+            self.load_tile_set(tile_set_filepath, compile_tileset)
+        self.propagation_engine = propagation_engine
+        self.entropy_heuristic = entropy_heuristic
+        self.backtrack_depth = backtrack_depth
+        self.wrap = wrap
+        self.decisions = deque()
+        self.backtracks = 0
+        self.wave = None
+        self.journal = None
+        self.stats = SolverStats()
+        self.engine = None
+        self.entropy = None
+        self.grid = self.set_new_grid()
         self.failed_collapsing = False
+        self.failed_node = None
+        self.initial_state = None
         self.apply_constraints()
+        self.save_initial_state()
 
     #Get/set
     def is_finished_collapsing(self):
         """Returns whether the grid is finished collapsing"""
         return self.finished_collapsing
 
+    def set_seed(self, seed):
+        """Reseeds the grid's random number generator. Reset the grid afterwards for the seed to fully determine
+        the result."""
+        self.seed = seed
+        self.rng.seed(seed)
+
+    def enable_journal(self, domains=False):
+        """Starts recording the cells changed by collapses, propagation, backtracking and resets.
+        Parameters:
+            domains: whether to record each changed cell's old and new domain masks as well
+        Returns:
+            the grid's ChangeJournal"""
+        if self.journal is None:
+            self.journal = ChangeJournal(self.wave, domains)
+        self.journal.domains = domains
+        return self.journal
+
+    def take_changes(self):
+        """Returns the cells changed since this was last called, and starts a new step. Call it once per step.
+        Returns:
+            None if every cell changed, as after a reset
+            otherwise a list of (x, y), or of (x, y, old mask, new mask) if the journal records domains."""
+        if self.journal is None:
+            self.enable_journal()
+            return None
+        return self.journal.take()
+
     def get_lowest_entropy_nodes(self):
         """Helper function that returns a list of nodes with the lowest entropy."""
-        lowest_entropy = len(self.all_tiles)
-        lowest_entropy_nodes = []
-        for row in self.grid:
-            for node in row:
-                if (node.is_collapsed() or
-                        (options := len(node.get_tile_options())) > lowest_entropy):
-                    continue
-                elif options == lowest_entropy:
-                    lowest_entropy_nodes.append(node)
-                else:
-                    lowest_entropy = options
-                    lowest_entropy_nodes = [node]
-        return lowest_entropy_nodes
+        return [self.get_node(index) for index in self.entropy.lowest_all()]
 
     def propagate(self, node: Node):
         """When a node is collapsed, this function is called. Propagates the collapse to neighboring nodes.
@@ -56,114 +141,282 @@ class Grid:
 
         Returns:
             True if the propagation was successful, False otherwise."""
-        try:
-            # Propagate
-            stack = [node]
-            while stack:
-                curr_node = stack.pop()
-                for direction in self.directions:
-                    other_node = None
-                    if direction == "left":
-                        other_node = self.grid[(curr_node.x - 1) % self.width][curr_node.y]
-                    elif direction == "right":
-                        other_node = self.grid[(curr_node.x + 1) % self.width][curr_node.y]
-                    elif direction == "up":
-                        other_node = self.grid[curr_node.x][(curr_node.y - 1) % self.height]
-                    elif direction == "down":
-                        other_node = self.grid[curr_node.x][(curr_node.y + 1) % self.height]
-                    other_tiles = other_node.get_tile_options()
-                    possible_neighbors = curr_node.get_valid_neighbors(direction)
-                    if len(possible_neighbors) == 0: continue
-
-                    for other_tile in other_tiles:
-                        if not other_tile in possible_neighbors:
-                            other_tile_options = set()
-                            other_tile_options.add(other_tile)
-                            new_options = other_tiles - other_tile_options
-                            other_node.set_tile_options(tile_options=new_options & other_node.get_tile_options())
-                            if not other_node in stack:
-                                stack.append(other_node)
+        start = time.perf_counter()
+        contradiction = self.engine.propagate([node.index])
+        self.stats.propagations += 1
+        self.stats.add_time("propagate", time.perf_counter() - start)
+        if contradiction is None:
             return True
-        except AttributeError as error:
-            print(error)
-            print(f"found contradiction in cell ({node.x},{node.y})")
-            self.finished_collapsing = True
-            return False
+        self.stats.contradictions += 1
+        self.failed_node = self.get_node(contradiction)
+        print(f"found contradiction in cell ({self.failed_node.x},{self.failed_node.y})")
+        self.finished_collapsing = True
+        self.failed_collapsing = True
+        return False
+
+    def restrict(self, masks, changed=()):
+        """Narrows the domains of many nodes at once, then propagates from all of them in a single pass.
+        Parameters:
+            masks: dict of cell index -> mask of the tiles that node may still be
+            changed: cells whose domains were already changed, to propagate from as well
+        Returns:
+            True if the propagation was successful, False otherwise."""
+        cells = self.wave.cells
+        changed = list(changed)
+        contradiction = None
+        for index, mask in masks.items():
+            new_mask = cells[index] & mask
+            if new_mask != cells[index]:
+                self.wave.set_mask(index, new_mask)
+                changed.append(index)
+                if not new_mask and contradiction is None:
+                    contradiction = index
+        start = time.perf_counter()
+        if contradiction is None:
+            contradiction = self.engine.propagate(changed)
+        self.stats.propagations += 1
+        self.stats.add_time("propagate", time.perf_counter() - start)
+        if contradiction is None:
+            return True
+        self.stats.contradictions += 1
+        self.failed_node = self.get_node(contradiction)
+        print(f"found contradiction in cell ({self.failed_node.x},{self.failed_node.y})")
+        self.finished_collapsing = True
+        self.failed_collapsing = True
+        return False
 
     def collapse_node(self, coordinates=None, tile_options=None):
         """Collapse the next tile on the grid.
         Returns:
-            True if we are out of nodes to collapse or the node was collapsed successfully.
-            False if there was an issue collapsing."""
+            True if we are out of nodes to collapse.
+            The collapsed node if it was collapsed successfully.
+            The node a contradiction was found in if there was an issue collapsing."""
+        stats = self.stats
         if coordinates is None or tile_options is None:
-            # 1. Obtain a list of tiles coordinates such that they have the least amount of options
-            lowest_entropy_nodes = self.get_lowest_entropy_nodes()
-            if not lowest_entropy_nodes:
+            # 1. Obtain a node with the least amount of options, chosen randomly among ties
+            start = time.perf_counter()
+            lowest_entropy_index = self.entropy.lowest()
+            stats.add_time("entropy", time.perf_counter() - start)
+            if lowest_entropy_index is None:
                 self.finished_collapsing = True
                 return True
-
-            # 2. From this list, randomly choose a tile to collapse
-            node = random.choice(lowest_entropy_nodes)
+            node = self.get_node(lowest_entropy_index)
+            decision = self.wave.mark() if self.backtrack_depth > 0 else None
         else:
             node = self.grid[coordinates[0]][coordinates[1]]
+            decision = None
         if tile_options:
             tile_options = {tile_options}
-        if not node.collapse(tile_options=tile_options):
+        start = time.perf_counter()
+        collapsed = node.collapse(tile_options=tile_options)
+        stats.add_time("collapse", time.perf_counter() - start)
+        stats.collapses += 1
+        if not collapsed:
+            stats.contradictions += 1
             print(f"found contradiction in node ({node.x},{node.y})")
             self.finished_collapsing = True
             self.failed_collapsing = True
+            self.failed_node = node
             return node
 
-        return node if self.propagate(node) else None
+        if decision is not None:
+            self.add_decision(decision, node)
+        return node if self.propagate(node) else self.failed_node
+
+    def add_decision(self, mark, node):
+        """Records the tile a node was randomly collapsed to, so the choice can be undone on a contradiction.
+        Only the most recent backtrack_depth decisions are kept."""
+        self.decisions.append((mark, node.index, node.get_tile_mask().bit_length() - 1))
+        if len(self.decisions) > self.backtrack_depth:
+            self.decisions.popleft()
+            self.wave.forget(self.decisions[0][0])
+
+    def backtrack(self):
+        """Recovers from a contradiction by undoing the wave back to the most recent decision, banning the tile
+        chosen there and propagating the ban. If that contradicts too, the decision before it is undone, and so on.
+        Returns:
+            True if the grid can continue collapsing.
+            False if the decisions ran out and the grid needs to be reset."""
+        while self.decisions:
+            mark, index, tile_index = self.decisions.pop()
+            self.engine.restore(self.wave.undo(mark))
+            self.backtracks += 1
+            self.stats.backtracks += 1
+            mask = self.wave.cells[index] & ~(1 << tile_index)
+            self.wave.set_mask(index, mask)
+            if mask and self.engine.propagate([index]) is None:
+                if self.debug: print(f"backtracked to cell {self.wave.coordinates(index)}")
+                self.finished_collapsing = False
+                self.failed_collapsing = False
+                self.failed_node = None
+                return True
+        return False
+
+    def load_tile_indexes(self, tile_indexes):
+        """Collapses every node to the tile at the given index of all_tiles, as returned by Wave.tile_indexes.
+        Used to adopt a grid that was solved somewhere else."""
+        for index, tile_index in enumerate(tile_indexes):
+            self.wave.set_collapsed(index, tile_index)
+        self.finished_collapsing = True
+        self.failed_collapsing = False
+        self.failed_node = None
+
+    def load_tile_set(self, tile_set_filepath, compile_tileset=True):
+        """Sets up the tiles, constraints and propagator of the grid. They are loaded from the tile set's compiled
+        file if it is up to date, otherwise the tile set is parsed, permuted and its neighbors derived, and the
+        result is compiled for next time."""
+        loaded = load_compiled_tileset(tile_set_filepath, self.directions) if compile_tileset else None
+        if loaded is not None:
+            self.all_tiles, self.constraints, self.region_constraints, self.propagator = loaded
+            return
+        self.base_tiles, constraints, region_constraints = import_tileset(tile_set_filepath)
+        self.all_tiles = self.permute_tiles(constraints, region_constraints)
+        # Set up neighbors for tiles
+        set_all_valid_neighbors(self.all_tiles, self.directions)
+        self.propagator = Propagator(self.all_tiles, self.directions)
+        if compile_tileset:
+            try:
+                write_compiled_tileset(tile_set_filepath, self.directions, self.all_tiles, self.constraints,
+                                       self.region_constraints, self.propagator)
+            except OSError as error:
+                print(f"could not compile tile set: {error}")
 
     def set_new_grid(self):
         """Initialized the grid."""
-        # Set up neighbors for tiles
-        for tile in self.all_tiles:
-            tile.set_valid_neighbors(self.all_tiles)
+        # Set up the wave and a grid of nodes viewing it
+        self.wave = Wave(self.width, self.height, self.all_tiles, self.directions, wrap=self.wrap, rng=self.rng)
+        if self.backtrack_depth > 0:
+            self.wave.trail = []
+        if self.journal is not None:
+            self.journal.attach(self.wave)
+        self.decisions = deque()
+        self.backtracks = 0
+        self.entropy = ENTROPY_HEURISTICS[self.entropy_heuristic](self.wave)
+        self.engine = PROPAGATION_ENGINES[self.propagation_engine](self.wave, self.propagator, self.stats)
+        return [[Node(i, j, self.wave) for j in range(self.height)] for i in range(self.width)]
 
-        # Set up grid of nodes
-        return [[Node(i, j, self.all_tiles) for j in range(self.height)] for i in range(self.width)]
+    def get_node(self, index):
+        """Returns the node at a cell index of the wave."""
+        x, y = self.wave.coordinates(index)
+        return self.grid[x][y]
 
-    def reset(self):
+    def save_initial_state(self):
+        """Snapshots the wave and propagation engine, with the constraints applied, for reset to restore."""
+        failed_index = self.failed_node.index if self.failed_collapsing else None
+        self.initial_state = (self.wave.snapshot(), self.engine.save_state(), failed_index)
+
+    def reset(self, rebuild=False):
+        """Resets the grid to its state once the constraints are applied, by copying back the snapshot taken then
+        rather than building a new wave and propagating the constraints again.
+        Parameters:
+            rebuild: whether to build a new wave and apply the constraints anyway, and snapshot the result
+        Returns:
+            True"""
+        start = time.perf_counter()
         self.finished_collapsing = False
         self.failed_collapsing = False
-        self.grid = self.set_new_grid()
-        self.apply_constraints()
+        self.failed_node = None
+        if rebuild or self.initial_state is None:
+            self.grid = self.set_new_grid()
+            self.apply_constraints()
+            self.save_initial_state()
+        else:
+            wave_state, engine_state, failed_index = self.initial_state
+            self.wave.restore(wave_state)
+            self.engine.load_state(engine_state)
+            self.decisions = deque()
+            self.backtracks = 0
+            if failed_index is not None:
+                # The constraints contradict each other, so every attempt fails the same way
+                self.finished_collapsing = True
+                self.failed_collapsing = True
+                self.failed_node = self.get_node(failed_index)
+        self.stats.resets += 1
+        self.stats.add_time("reset", time.perf_counter() - start)
         return True
 
-    def permute_tiles(self, constraints):
+    def permute_tiles(self, constraints, region_constraints=()):
         """Given a set of basic tiles, permutes them base on the instructions on the tile itself.
         Parameters:
             constraints: List of constraints to be added to grids self.constraint add we create the permuted tiles
+            region_constraints: list of region constraints as read from the tile set, added to
+                self.region_constraints once their tiles are known
         Returns:
             list of permuted tiles"""
         permuted_tiles = []
+        self.merged_tiles = 0
+        # (tile id, rotations) -> the tile that rotation became, after merging
+        variants = dict()
         for tile in self.base_tiles:
             if tile.rotations == 0:
                 permuted_tiles.append(tile)
+                variants[(tile.id, 0)] = tile
             else:
+                # Rotations with the same sockets and the same look are one tile, holding the weight of all of them
+                rotated_tiles = dict()
                 for rotation in range(tile.rotations):
-                    new_tile = tile.copy_tile_and_rotate(rotation)
-                    permuted_tiles.append(new_tile)
+                    new_tile = tile.copy_tile_and_rotate(rotation, self.directions)
+                    same_tiles = rotated_tiles.setdefault(new_tile.side_signature(self.directions), [])
+                    kept_tile = next((same_tile for same_tile in same_tiles if same_tile.renders_like(new_tile)), None)
+                    if kept_tile is None:
+                        kept_tile = new_tile
+                        same_tiles.append(new_tile)
+                        permuted_tiles.append(new_tile)
+                    else:
+                        kept_tile.weight += new_tile.weight
+                        self.merged_tiles += 1
+                    variants[(tile.id, rotation)] = kept_tile
 
                     for constraint in constraints:
                         if new_tile.id == constraint["tile_id"] and new_tile.rotations == constraint["rotations"]:
-                            self.add_constraint(new_tile, constraint["nodes_to_constrain"])
+                            self.add_constraint(kept_tile, constraint["nodes_to_constrain"])
+        if self.merged_tiles:
+            print(f"merged {self.merged_tiles} symmetric rotations: "
+                  f"{len(permuted_tiles) + self.merged_tiles} -> {len(permuted_tiles)} tiles")
+        for region_constraint in region_constraints:
+            region = {key: value for key, value in region_constraint.items() if key != "tiles"}
+            self.region_constraints.append((region, region_tiles(region_constraint, variants)))
         return permuted_tiles
 
     def add_constraint(self, tile, coordinates):
-        """Adds a constraint to the grid."""
+        """Adds a constraint to the grid. Applied on the next reset."""
+        self.initial_state = None
         for coordinate in coordinates:
             if self.constraints.get(tile):
                 self.constraints[tile].append(tuple(coordinate))
             else:
                 self.constraints[tile] = [tuple(coordinate)]
 
+    def add_region_constraint(self, region, tiles):
+        """Limits every node of a region to the given tiles. Applied on the next reset.
+        Parameters:
+            region: dict describing the cells, see regions.py
+            tiles: the tiles the region's nodes may be"""
+        region_cells(region, self.width, self.height)
+        self.initial_state = None
+        self.region_constraints.append((dict(region), list(tiles)))
+
     def apply_constraints(self):
+        """Collapses the nodes pinned to a tile and narrows every region to the tiles it allows, then propagates
+        from all of them in a single pass.
+        Returns:
+            True if the propagation was successful, False otherwise."""
+        wave = self.wave
+        pinned = []
         for tile, coordinates in self.constraints.items():
-            for coordinate in coordinates:
-                self.collapse_node(coordinate, tile)
+            for x, y in coordinates:
+                index = wave.index(x, y)
+                wave.set_collapsed(index, wave.tile_index[tile])
+                pinned.append(index)
+        masks = dict()
+        for region, tiles in self.region_constraints:
+            mask = wave.mask_of(tiles)
+            for x, y in region_cells(region, self.width, self.height):
+                index = wave.index(x, y)
+                masks[index] = masks.get(index, wave.full_mask) & mask
+        if not pinned and not masks:
+            return True
+        return self.restrict(masks, pinned)
 
 
 def import_tileset(filepath):
@@ -171,7 +424,7 @@ def import_tileset(filepath):
     Parameters:
         filepath: the filepath to the tileset
     Returns:
-        Set of base tiles."""
+        Set of base tiles, the tile set's constraints and its region constraints."""
     try:
         base_tiles = []
         with open(filepath, 'r') as file:
@@ -182,17 +435,22 @@ def import_tileset(filepath):
                 weight = tile['weight']
             except KeyError:
                 weight = 1
+            symmetry = tile.get('symmetry', 4)
+            if symmetry not in (1, 2, 4):
+                raise ValueError(f"tile {tile['id']} has symmetry {symmetry}, which must be 1, 2 or 4")
             base_tiles.append(Tile(ext_id = tile['id'],
-                                   image_path=tile['image_path'],
+                                   image_path=os.path.join(os.path.dirname(filepath), tile['image_path']),
                                    sides=sides,
                                    rotations=tile['number_of_rotations'],
-                                   weight=weight))
+                                   weight=weight,
+                                   symmetry=symmetry))
         try:
             constraints = data['constraints']
         except KeyError:
             print('no constraints found')
             constraints = dict()
-        return base_tiles, constraints
+        region_constraints = data.get('region_constraints', [])
+        return base_tiles, constraints, region_constraints
     except FileNotFoundError as error:
         print(error)
         raise
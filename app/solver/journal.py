@@ -0,0 +1,48 @@
+class ChangeJournal:
+    """
+    Records which cells of a grid's wave change, so consumers can read exactly the delta of each step instead of
+    polling every node. A cell changed several times is recorded once, with its domain from before the first change.
+    """
+    def __init__(self, wave, domains=False):
+        """
+            domains: whether changes carry the cell's old and new domain masks as well as its coordinates
+            changes: cell index -> domain mask before its first change since the last take
+            everything: whether the whole wave was reset or replaced since the last take
+        """
+        self.domains = domains
+        self.changes = dict()
+        self.everything = False
+        self.wave = None
+        self.attach(wave, everything=False)
+
+    def attach(self, wave, everything=True):
+        """Starts recording a new wave, as when the grid is reset. Every cell counts as changed."""
+        if self.wave is not None and self in self.wave.observers:
+            self.wave.observers.remove(self)
+        self.wave = wave
+        wave.observers.append(self)
+        self.changes = dict()
+        self.everything = everything
+
+    def cell_changed(self, index, old_mask):
+        if index not in self.changes:
+            self.changes[index] = old_mask
+
+    def wave_reset(self):
+        self.changes = dict()
+        self.everything = True
+
+    def take(self):
+        """Returns the changes since the last take, in the order cells were first changed, and starts a new step.
+        Returns:
+            None if every cell changed
+            otherwise a list of (x, y), or of (x, y, old mask, new mask) if the journal records domains."""
+        changes, everything = self.changes, self.everything
+        self.changes = dict()
+        self.everything = False
+        if everything:
+            return None
+        coordinates, cells = self.wave.coordinates, self.wave.cells
+        if self.domains:
+            return [(*coordinates(index), old_mask, cells[index]) for index, old_mask in changes.items()]
+        return [coordinates(index) for index in changes]
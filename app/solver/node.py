@@ -1,13 +1,14 @@
-import random
-
 class Node:
     """
     Representation of the data for a single node on the grid of the wave.
+    The node's state lives in the grid's Wave. The node is a view onto its cell in the wave.
     """
-    def __init__(self, x, y, tile_options):
+    def __init__(self, x, y, wave):
         """
         Instantiates an instance of a node.
         x, y: coordinates on the grid
+        wave: the wave holding this node's state
+        index: position of this node's cell in the wave
         tile_options: set of possibilities for which tile it can represent
         collapsed: current state of the node
         tile: if it is collapsed, the specific tile information for the node.
@@ -15,41 +16,63 @@ class Node:
         """
         self.x = x
         self.y = y
-        self.tile_options = set(tile_options)
-        self.collapsed = False
-        self.tile = None
-        self.updated = False
+        self.wave = wave
+        self.index = wave.index(x, y)
 
     def __str__(self):
         """String representation of the node."""
         return f'[{self.x}][{self.y}]: {self.tile}'
 
+    @property
+    def tile_options(self):
+        """Set of possibilities for which tile it can represent, decoded from the wave."""
+        return self.wave.tiles_of(self.wave.cells[self.index])
+
+    @tile_options.setter
+    def tile_options(self, tile_options):
+        self.wave.set_mask(self.index, self.wave.mask_of(tile_options))
+
+    @property
+    def collapsed(self):
+        """Current state of the node."""
+        return bool(self.wave.collapsed[self.index])
+
+    @property
+    def tile(self):
+        """If it is collapsed, the specific tile information for the node."""
+        if not self.wave.collapsed[self.index]:
+            return None
+        return self.wave.tiles[self.wave.cells[self.index].bit_length() - 1]
+
+    @property
+    def updated(self):
+        """Flag field for if the tile has been updated recently."""
+        return bool(self.wave.updated[self.index])
+
+    @updated.setter
+    def updated(self, value):
+        self.wave.updated[self.index] = value
+
     def collapse(self, tile_options=None):
         """Collapse the node by randomly choosing from it's list of tile options.
         Returns:
             False if no options remain
             True if we set the tile and it was successful."""
         self.updated = True
-        if not self.tile_options:
+        mask = self.wave.cells[self.index]
+        if not mask:
             return False
-        tile_options_tuple = tuple(self.tile_options)
         if tile_options:
-            tile_options_tuple = tuple(tile_options)
+            mask = self.wave.mask_of(tile_options)
 
-        tile_options_weights = [tile.weight for tile in tile_options_tuple]
-        tile = random.choices(population=tile_options_tuple,
-                              weights=tile_options_weights,
-                              k=1)[0]
-        return self.set_tile(tile=tile)
+        self.wave.set_collapsed(self.index, self.wave.weights.sample(mask, rng=self.wave.rng))
+        return True
 
     def reset_tile(self, tile_options):
         """Reset the node to its initial state, given its current neighbors."""
         try:
-            self.collapsed = False
-            self.tile = None
-            self.updated = True
-            self.tile_options = tile_options
-        except AttributeError:
+            self.wave.set_uncollapsed(self.index, self.wave.mask_of(tile_options))
+        except (AttributeError, KeyError):
             return False
 
     def is_collapsed(self):
@@ -60,6 +83,10 @@ class Node:
         """Returns the set of possibilities for which tile it can represent"""
         return self.tile_options
 
+    def get_tile_mask(self):
+        """Returns the possibilities for which tile it can represent as a mask of tile indexes."""
+        return self.wave.cells[self.index]
+
     def get_valid_neighbors(self, direction):
         """Returns the set of valid neighbors in a specific direction as a list (it is normally a set)"""
         result = []
@@ -70,18 +97,13 @@ class Node:
     def set_tile_options(self, tile_options):
         """Sets the set of possibilities for which tile can represent. Usually this is used during grid propagation."""
         self.tile_options = tile_options
-        self.updated = True
 
     def set_tile(self, tile):
         """Attempts to set the node to a specific tile. Returns false if it does not work."""
         try:
-            self.collapsed = True
-            self.tile_options = set()
-            self.tile_options.add(tile)
-            self.tile = tile
-            self.updated = True
+            self.wave.set_collapsed(self.index, self.wave.tile_index[tile])
             return True
-        except AttributeError:
+        except (AttributeError, KeyError):
             return False
 
     def set_updated(self, value=False):
@@ -101,4 +123,4 @@ class Node:
 
     def get_collapsed(self):
         """Get the node's collapsed state."""
-        return self.collapsed
\ No newline at end of file
+        return self.collapsed
@@ -0,0 +1,96 @@
+"""
+Opt-in profiling of a solve. Captures where time goes with cProfile and, optionally, where memory is allocated with
+tracemalloc. Both slow the solve down noticeably, so they are only started when asked for: with --profile and
+--trace-memory on the command line, or with PROFILE in the [debug] section of settings.ini for the launcher.
+"""
+import cProfile
+import io
+import os
+import pstats
+import time
+import tracemalloc
+
+
+class Profiler:
+    """
+    Captures a cProfile profile, and optionally tracemalloc allocation statistics, between start and stop.
+    Can also be used as a context manager.
+    """
+    def __init__(self, cpu=True, memory=False):
+        """
+            cpu: whether to profile function calls with cProfile
+            memory: whether to trace memory allocations with tracemalloc
+            profile: the cProfile.Profile, once started
+            snapshot: the tracemalloc snapshot taken when stopped
+            peak_memory: largest amount of traced memory, in bytes, while running
+            seconds: wall time between start and stop
+        """
+        self.cpu = cpu
+        self.memory = memory
+        self.profile = None
+        self.snapshot = None
+        self.peak_memory = None
+        self.seconds = 0.0
+        self.start_time = None
+
+    def start(self):
+        if self.memory:
+            tracemalloc.start()
+        if self.cpu:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        self.start_time = time.perf_counter()
+        return self
+
+    def stop(self):
+        if self.start_time is None:
+            return self
+        self.seconds += time.perf_counter() - self.start_time
+        self.start_time = None
+        if self.profile is not None:
+            self.profile.disable()
+        if self.memory and tracemalloc.is_tracing():
+            self.snapshot = tracemalloc.take_snapshot()
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return self
+
+    def report(self, limit=20):
+        """Returns a text report of the functions with the most cumulative time, and the lines that allocated the
+        most memory still held when stopped."""
+        lines = [f"Profiled {self.seconds:.3f}s"]
+        if self.profile is not None:
+            stream = io.StringIO()
+            pstats.Stats(self.profile, stream=stream).sort_stats("cumulative").print_stats(limit)
+            lines.append(stream.getvalue())
+        if self.snapshot is not None:
+            lines.append(f"Peak traced memory: {self.peak_memory / 1024:.1f} KiB")
+            for statistic in self.snapshot.statistics("lineno")[:limit]:
+                lines.append(str(statistic))
+        return "\n".join(lines)
+
+    def save(self, path):
+        """Writes the cProfile profile to path, to be read with pstats or a viewer such as snakeviz.
+        Returns:
+            the path written to, or None if function calls were not profiled."""
+        if self.profile is None:
+            return None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.profile.dump_stats(path)
+        return path
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def format_stats(stats):
+    """Formats a snapshot from Solver.stats as lines of text."""
+    lines = [f"{name}: {value}" for name, value in stats.items() if name != "phase_seconds"]
+    for phase, seconds in sorted(stats["phase_seconds"].items(), key=lambda item: -item[1]):
+        lines.append(f"{phase}: {seconds:.4f}s")
+    return "\n".join(lines)
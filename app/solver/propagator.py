@@ -0,0 +1,322 @@
+from app.solver.wave import iter_bits, OPPOSITE_DIRECTIONS
+from app.solver.stats import SolverStats
+
+
+class Propagator:
+    """
+    Adjacency rules compiled once from Tile.valid_neighbors into masks of tile indexes.
+    For each direction and tile index, holds the mask of tiles which may be placed next to that tile in that direction.
+    """
+    MAX_CACHED_MASKS = 1 << 16
+
+    def __init__(self, tiles, directions, masks=None):
+        """
+        Compiles the propagator for a list of tiles whose valid neighbors have already been set.
+            masks: for each direction, list of compatible-tile masks indexed by tile index. Taken as given when
+                they are already known, as they are for a compiled tile set
+            allowed_cache: for each direction, memo of domain mask -> allowed-neighbor mask
+        """
+        self.directions = directions
+        if masks is not None:
+            self.masks = {direction: list(masks[direction]) for direction in directions}
+        else:
+            tile_index = {tile: i for i, tile in enumerate(tiles)}
+            self.masks = dict()
+            for direction in directions:
+                table = []
+                for tile in tiles:
+                    mask = 0
+                    for neighbor in tile.valid_neighbors[direction]:
+                        mask |= 1 << tile_index[neighbor]
+                    table.append(mask)
+                self.masks[direction] = table
+        self.allowed_cache = {direction: dict() for direction in directions}
+
+    def allowed(self, direction, mask):
+        """Returns the mask of tiles that may neighbor a cell with domain mask in the given direction.
+        This is the OR of the compatible masks of every tile in the domain."""
+        cache = self.allowed_cache[direction]
+        allowed = cache.get(mask)
+        if allowed is None:
+            table = self.masks[direction]
+            allowed = 0
+            for i in iter_bits(mask):
+                allowed |= table[i]
+            if len(cache) >= self.MAX_CACHED_MASKS:
+                cache.clear()
+            cache[mask] = allowed
+        return allowed
+
+
+class AC3Engine:
+    """
+    Propagation engine which re-derives a cell's allowed neighbors from its whole domain each time it is visited.
+    Cheap to set up, and fast when the tile set is small.
+    """
+    def __init__(self, wave, propagator, stats=None):
+        """
+            wave: the wave being propagated
+            propagator: compiled adjacency masks
+            stats: SolverStats counting the cells visited, tiles banned and worklist peak of every propagation
+            queued: flag per cell for whether it is on the worklist, for O(1) membership checks
+        """
+        self.wave = wave
+        self.propagator = propagator
+        self.stats = stats if stats is not None else SolverStats()
+        self.queued = bytearray(wave.size)
+
+    def restore(self, indices):
+        """Called after changes to the given cells have been undone. Nothing is derived from the wave, so there is
+        nothing to bring up to date."""
+        return None
+
+    def save_state(self):
+        """Returns what load_state needs to put the engine back in step with a wave snapshot. Nothing is derived
+        from the wave, so there is nothing to save."""
+        return None
+
+    def load_state(self, state):
+        """Called after the wave has been restored from the snapshot state was saved with."""
+        self.queued = bytearray(self.wave.size)
+
+    def propagate(self, indices):
+        """Propagates changes made to the domains of the given cells until nothing else changes.
+        Parameters:
+            indices: the cells whose domains were changed
+        Returns:
+            The index of the first cell left with no options, or None if propagation succeeded."""
+        wave, propagator, queued = self.wave, self.propagator, self.queued
+        cells = wave.cells
+        neighbors = [(direction, wave.neighbors[direction]) for direction in wave.directions]
+        stack = list(indices)
+        for index in stack:
+            queued[index] = 1
+        # Counted locally and added to the stats once, to keep the loop tight
+        visited = banned = 0
+        peak = len(stack)
+        contradiction = None
+        while stack:
+            curr_index = stack.pop()
+            queued[curr_index] = 0
+            visited += 1
+            curr_mask = cells[curr_index]
+            for direction, neighbor in neighbors:
+                other_index = neighbor[curr_index]
+                if other_index < 0: continue
+                other_mask = cells[other_index]
+                new_mask = other_mask & propagator.allowed(direction, curr_mask)
+                if new_mask != other_mask:
+                    wave.set_mask(other_index, new_mask)
+                    banned += (other_mask ^ new_mask).bit_count()
+                    if not new_mask:
+                        self.clear(stack)
+                        contradiction = other_index
+                        break
+                    if not queued[other_index]:
+                        queued[other_index] = 1
+                        stack.append(other_index)
+                        if len(stack) > peak:
+                            peak = len(stack)
+            if contradiction is not None:
+                break
+        stats = self.stats
+        stats.cells_visited += visited
+        stats.tiles_banned += banned
+        if peak > stats.worklist_peak:
+            stats.worklist_peak = peak
+        return contradiction
+
+    def clear(self, stack):
+        """Empties the worklist after a contradiction."""
+        for index in stack:
+            self.queued[index] = 0
+        stack.clear()
+
+
+class AC4Engine:
+    """
+    Propagation engine which keeps, for every cell, direction and tile, a count of the tiles in the neighboring
+    cell that support it. Removing a tile decrements its neighbors' counts, and a tile is only banned once its
+    count in some direction reaches zero. Pays off on large tile sets, where re-deriving a whole domain is costly.
+    When a cell loses many tiles at once (a collapse) or has tiles restored (a backtrack), its neighbors' counts are
+    replaced in bulk by the counts for the new domain, which are cached per domain.
+    """
+    MAX_INCREMENTAL_REMOVALS = 2
+    MAX_CACHED_ROWS = 1 << 14
+
+    def __init__(self, wave, propagator, stats=None):
+        """
+            wave: the wave being propagated
+            propagator: compiled adjacency masks
+            stats: SolverStats counting the cells visited, tiles banned and worklist peak of every propagation
+            compatible: for each direction index and tile index, list of tile indexes compatible in that direction
+            counts: flat list of support counts. counts[(index * D + d) * T + t] is the number of tiles in the
+                neighbor of cell index in direction d which allow tile t in cell index. Cells on the edge of a grid
+                that does not wrap count every tile as support from past the edge.
+            row_cache: memo of (d, neighbor mask) -> (support counts, mask of tiles with no support)
+            seen: the domain of each cell when its counts were last brought up to date
+            queued: flag per cell for whether it is on the worklist, for O(1) membership checks
+        """
+        self.wave = wave
+        self.propagator = propagator
+        self.stats = stats if stats is not None else SolverStats()
+        self.directions = list(wave.directions)
+        self.tile_count = len(wave.tiles)
+        self.compatible = [[list(iter_bits(mask)) for mask in propagator.masks[direction]]
+                           for direction in self.directions]
+        self.opposite = [self.directions.index(OPPOSITE_DIRECTIONS[direction]) for direction in self.directions]
+        self.counts = []
+        self.row_cache = dict()
+        self.seen = []
+        self.queued = bytearray(wave.size)
+        self.reset()
+
+    def support_row(self, d, mask):
+        """Returns the support counts of a cell whose neighbor in direction d has domain mask, and the mask of
+        tiles left with no support."""
+        row = self.row_cache.get((d, mask))
+        if row is None:
+            compatible = self.compatible[self.opposite[d]]
+            counts = [0] * self.tile_count
+            for t in iter_bits(mask):
+                for t2 in compatible[t]:
+                    counts[t2] += 1
+            zero_mask = 0
+            for t2, count in enumerate(counts):
+                if not count:
+                    zero_mask |= 1 << t2
+            if len(self.row_cache) >= self.MAX_CACHED_ROWS:
+                self.row_cache.clear()
+            row = self.row_cache[(d, mask)] = (counts, zero_mask)
+        return row
+
+    def reset(self):
+        """Rebuilds every support count from the current wave, then bans any tile left without support.
+        Returns:
+            The index of a cell left with no options, or None."""
+        wave = self.wave
+        cells = wave.cells
+        direction_count, tile_count = len(self.directions), self.tile_count
+        self.queued = bytearray(wave.size)
+        self.seen = list(cells)
+        counts = [0] * (wave.size * direction_count * tile_count)
+        unsupported = []
+        # Past the edge every tile is supported, even one nothing may sit next to. sync never updates these rows,
+        # as there is no neighbor whose domain could change them
+        edge_row = ([1] * tile_count, 0)
+        for d, direction in enumerate(self.directions):
+            neighbor = wave.neighbors[direction]
+            for index in range(wave.size):
+                other_index = neighbor[index]
+                row, zero_mask = self.support_row(d, cells[other_index]) if other_index >= 0 else edge_row
+                base = (index * direction_count + d) * tile_count
+                counts[base:base + tile_count] = row
+                if cells[index] & zero_mask:
+                    unsupported.append((index, zero_mask))
+        self.counts = counts
+
+        changed = []
+        for index, zero_mask in unsupported:
+            if cells[index] & zero_mask:
+                wave.set_mask(index, cells[index] & ~zero_mask)
+                changed.append(index)
+        return self.propagate(changed) if changed else None
+
+    def propagate(self, indices):
+        """Propagates changes made to the domains of the given cells until nothing else changes.
+        Parameters:
+            indices: the cells whose domains were changed
+        Returns:
+            The index of the first cell left with no options, or None if propagation succeeded."""
+        wave, queued = self.wave, self.queued
+        cells = wave.cells
+        for index in indices:
+            if not cells[index]:
+                return index
+        stack = list(indices)
+        for index in stack:
+            queued[index] = 1
+        stats = self.stats
+        visited = 0
+        peak = len(stack)
+        contradiction = None
+        while stack:
+            curr_index = stack.pop()
+            queued[curr_index] = 0
+            visited += 1
+            contradiction = self.sync(curr_index, stack)
+            if contradiction is not None:
+                for index in stack:
+                    queued[index] = 0
+                stack.clear()
+                break
+            if len(stack) > peak:
+                peak = len(stack)
+        stats.cells_visited += visited
+        if peak > stats.worklist_peak:
+            stats.worklist_peak = peak
+        return contradiction
+
+    def restore(self, indices):
+        """Called after changes to the given cells have been undone. Brings the support counts back in line with
+        the restored domains."""
+        stack = []
+        for index in indices:
+            self.sync(index, stack)
+
+    def save_state(self):
+        """Returns a copy of the support counts, to be put back by load_state along with a wave snapshot."""
+        return list(self.counts), list(self.seen)
+
+    def load_state(self, state):
+        """Called after the wave has been restored from the snapshot state was saved with. Copies the saved support
+        counts back instead of rebuilding them."""
+        counts, seen = state
+        self.counts[:] = counts
+        self.seen[:] = seen
+        self.queued = bytearray(self.wave.size)
+
+    def sync(self, index, stack):
+        """Brings the support counts of a cell's neighbors up to date with the cell's domain.
+        Bans neighboring tiles whose support reaches zero and adds those neighbors to the stack.
+        Returns:
+            The index of a cell left with no options, or None."""
+        wave, counts, queued, seen = self.wave, self.counts, self.queued, self.seen
+        cells = wave.cells
+        old_mask, new_mask = seen[index], cells[index]
+        if old_mask == new_mask:
+            return None
+        seen[index] = new_mask
+        removed = old_mask & ~new_mask
+        incremental = old_mask & new_mask == new_mask and removed.bit_count() <= self.MAX_INCREMENTAL_REMOVALS
+        direction_count, tile_count = len(self.directions), self.tile_count
+        for d, direction in enumerate(self.directions):
+            other_index = wave.neighbors[direction][index]
+            if other_index < 0: continue
+            base = (other_index * direction_count + self.opposite[d]) * tile_count
+            if incremental:
+                compatible = self.compatible[d]
+                banned = 0
+                for t in iter_bits(removed):
+                    for t2 in compatible[t]:
+                        count = counts[base + t2] - 1
+                        counts[base + t2] = count
+                        if not count:
+                            banned |= 1 << t2
+            else:
+                row, banned = self.support_row(self.opposite[d], new_mask)
+                counts[base:base + tile_count] = row
+            banned &= cells[other_index]
+            if banned:
+                self.stats.tiles_banned += banned.bit_count()
+                other_mask = cells[other_index] & ~banned
+                wave.set_mask(other_index, other_mask)
+                if not other_mask:
+                    return other_index
+                if not queued[other_index]:
+                    queued[other_index] = 1
+                    stack.append(other_index)
+        return None
+
+
+PROPAGATION_ENGINES = {"AC3": AC3Engine, "AC4": AC4Engine}
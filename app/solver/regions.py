@@ -0,0 +1,70 @@
+"""
+Region constraints. A tile set's JSON can limit whole areas of the grid to a subset of its tiles, under
+"region_constraints", instead of listing every node:
+    {"rows": [0, 0], "tiles": [1]}                              the top row may only be tile 1, in any rotation
+    {"columns": [-2, -1], "tiles": [{"tile_id": 2, "rotations": 1}, 3]}
+    {"rect": [4, 4, 3, 2], "tiles": [5]}                        x, y, width and height
+    {"border": 1, "edges": ["up", "down"], "tiles": [1]}        cells within 1 of the given edges, all edges if omitted
+    {"cells": [[0, 5], [7, 7]], "tiles": [1, 2]}
+Rows and columns are inclusive ranges, and negative numbers count back from the far edge, so regions fit any grid size.
+Every region is narrowed before anything is propagated, so applying them costs a single propagation.
+"""
+REGION_KINDS = ("cells", "rows", "columns", "rect", "border")
+
+
+def resolve(position, size):
+    """Returns a row or column number, counting negative numbers back from size."""
+    return position + size if position < 0 else position
+
+
+def region_cells(region, width, height):
+    """Returns the (x, y) coordinates of the cells in a region of a width x height grid. Parts of the region outside
+    the grid are left out.
+    Parameters:
+        region: dict with one of the keys in REGION_KINDS, as read from the tile set's JSON"""
+    kinds = [kind for kind in REGION_KINDS if kind in region]
+    if len(kinds) != 1:
+        raise ValueError(f"region constraint {region} needs exactly one of {', '.join(REGION_KINDS)}")
+    kind = kinds[0]
+    if kind == "cells":
+        cells = [tuple(cell) for cell in region["cells"]]
+    elif kind == "rows":
+        first, last = (resolve(row, height) for row in region["rows"])
+        cells = [(x, y) for x in range(width) for y in range(first, last + 1)]
+    elif kind == "columns":
+        first, last = (resolve(column, width) for column in region["columns"])
+        cells = [(x, y) for x in range(first, last + 1) for y in range(height)]
+    elif kind == "rect":
+        left, top, rect_width, rect_height = region["rect"]
+        left, top = resolve(left, width), resolve(top, height)
+        cells = [(x, y) for x in range(left, left + rect_width) for y in range(top, top + rect_height)]
+    else:
+        thickness = region["border"]
+        edges = set(region.get("edges", ("up", "right", "down", "left")))
+        cells = [(x, y) for x in range(width) for y in range(height)
+                 if ("up" in edges and y < thickness) or ("down" in edges and y >= height - thickness)
+                 or ("left" in edges and x < thickness) or ("right" in edges and x >= width - thickness)]
+    return [(x, y) for x, y in cells if 0 <= x < width and 0 <= y < height]
+
+
+def region_tiles(region_constraint, variants):
+    """Returns the tiles a region constraint allows.
+    Parameters:
+        region_constraint: the constraint as read from the tile set's JSON. Its tiles are tile ids, meaning every
+            rotation of that tile, or {"tile_id": id, "rotations": r} for a single rotation
+        variants: dict of (tile id, rotations) -> tile, for every tile after permutations"""
+    tiles = []
+    for spec in region_constraint["tiles"]:
+        if isinstance(spec, dict):
+            if "rotations" in spec:
+                key = (spec["tile_id"], spec["rotations"])
+                if key not in variants:
+                    raise ValueError(f"region constraint {region_constraint} names unknown tile {key}")
+                tiles.append(variants[key])
+                continue
+            spec = spec["tile_id"]
+        tiles.extend(tile for (tile_id, _), tile in variants.items() if tile_id == spec)
+    if not tiles:
+        raise ValueError(f"region constraint {region_constraint} allows no tiles")
+    # Merged rotations map to the same tile
+    return list(dict.fromkeys(tiles))
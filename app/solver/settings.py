@@ -0,0 +1,85 @@
+"""
+Settings for the solver. settings.ini is found relative to the repository rather than the working directory, and is
+parsed once into a SolverConfig which is handed to everything that needs it, including worker processes.
+"""
+from pathlib import Path
+import configparser
+
+ROOT_PATH = Path(__file__).resolve().parents[2]
+SETTINGS_PATH = ROOT_PATH / 'settings.ini'
+DEFAULT_DIRECTIONS = ('up', 'right', 'down', 'left')
+
+
+def read_settings(path=SETTINGS_PATH):
+    """Parses settings.ini.
+    Returns:
+        the ConfigParser holding the settings."""
+    config = configparser.ConfigParser()
+    config.read(path)
+    return config
+
+
+def get_json_path(config, tile_set_name=None):
+    """Returns the path to the JSON of the tile set named in the settings, or of tile_set_name if given."""
+    tile_set_name = tile_set_name or config['tiles']['TILE_SET_NAME']
+    return str(ROOT_PATH / config['tiles']['TILE_SET_FOLDER'] / tile_set_name / f"{tile_set_name}.json")
+
+
+class SolverConfig:
+    """
+    Everything a solver needs to know to set up its grid, as plain data.
+    Build one from explicit parameters, or from settings.ini with from_settings.
+    """
+    def __init__(self, tile_set_filepath, width, height, directions=DEFAULT_DIRECTIONS, fail_condition="RESET",
+                 propagation_engine="AC3", entropy_heuristic="COUNT", backtrack_depth=0, debug=False,
+                 compile_tileset=True):
+        """
+            tile_set_filepath: path to the tile set's JSON
+            width, height: dimensions of the grid
+            directions: names of the directions, in the order up, right, down, left
+            fail_condition: what the solver does on a contradiction. One of END, RESET, RESET_FROM_FAIL, BACKTRACK
+            propagation_engine: name of the engine in PROPAGATION_ENGINES
+            entropy_heuristic: name of the heuristic in ENTROPY_HEURISTICS
+            backtrack_depth: how many decisions the grid can undo. Only used when fail_condition is BACKTRACK
+            compile_tileset: whether grids load the tile set from its compiled file, and write that file when it is
+                missing or stale
+        """
+        self.tile_set_filepath = str(tile_set_filepath)
+        self.width = width
+        self.height = height
+        self.directions = list(directions)
+        self.fail_condition = fail_condition
+        self.propagation_engine = propagation_engine
+        self.entropy_heuristic = entropy_heuristic
+        self.backtrack_depth = backtrack_depth
+        self.debug = debug
+        self.compile_tileset = compile_tileset
+
+    @classmethod
+    def from_settings(cls, config=None, tile_set_name=None, width=None, height=None, debug=False):
+        """Builds a solver config from parsed settings. The tile set and grid dimensions can be overridden.
+        Parameters:
+            config: ConfigParser of the settings. settings.ini is read if not given"""
+        if config is None:
+            config = read_settings()
+        return cls(get_json_path(config, tile_set_name),
+                   width or int(config['grid']['GRID_DIM_WIDTH']),
+                   height or int(config['grid']['GRID_DIM_HEIGHT']),
+                   directions=config['tiles']['DIRECTIONS'].split(','),
+                   fail_condition=str(config['contradiction']['FAIL_CONDITION']),
+                   propagation_engine=config.get('propagation', 'PROPAGATION_ENGINE', fallback="AC3"),
+                   entropy_heuristic=config.get('propagation', 'ENTROPY_HEURISTIC', fallback="COUNT"),
+                   backtrack_depth=config.getint('contradiction', 'BACKTRACK_DEPTH', fallback=100),
+                   debug=debug)
+
+    @property
+    def tile_set_name(self):
+        """Name of the tile set, taken from its JSON's file name."""
+        return Path(self.tile_set_filepath).stem
+
+    def copy(self, **changes):
+        """Returns a copy of this config with some of its fields changed."""
+        config = SolverConfig(**vars(self))
+        for name, value in changes.items():
+            setattr(config, name, value)
+        return config
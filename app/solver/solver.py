@@ -1,13 +1,9 @@
 from app.solver.grid import Grid
+from app.solver.settings import SolverConfig
+from contextlib import nullcontext, redirect_stdout
 import configparser
-
-
-def get_json_path(config):
-    """Parse the settings.ini file to find the path to the tileset instructions"""
-    base_path = f"../../{config['tiles']['TILE_SET_FOLDER']}"
-    tile_set_name = config["tiles"]["TILE_SET_NAME"]
-    tile_set_filepath = f"{base_path}/{tile_set_name}"
-    return f"{tile_set_filepath}/{tile_set_name}.json"
+import os
+import time
 
 
 class Solver:
@@ -15,23 +11,49 @@ class Solver:
     Main class in wave function collapse backend. Responsible for orchestrating the collapse.
     If this class is ran as the main executable, rather than using a GUI to call this class, it prints to the command line.
     """
-    def __init__(self, debug=False):
+    def __init__(self, debug=False, tile_set_name=None, width=None, height=None, seed=None, cache=None, config=None,
+                 on_step=None, tile_set=None):
         """
-        Creates a solver instance given a settings.ini, set of tiles, and tile instructions are in the directory.
+        Creates a solver instance from a SolverConfig, or from settings.ini. The tile set and grid dimensions in
+        settings.ini can be overridden by the parameters.
+            config: a SolverConfig, which is used as is, or a ConfigParser of the settings to build one from.
+                settings.ini is read once if neither is given
             grid: Reference to the grid object holding the node data
             fail_condition: determines how the application logic behaves when a contradictory collapse is generated
+            restarts: number of times the grid has been reset because of a contradiction
+            tile_set_name: name of the tile set folder being solved
+            attempt_reports: after solve_parallel, what each worker process did
+            cache: optional ResultCache. Solving with an explicit seed returns a cached grid instead of solving it
+                again, and stores newly solved grids.
+            on_step: optional callback, called as on_step(solver, result) after every step with what solve_next
+                returned. Read solver.stats() from it to follow a solve as it runs
+            tile_set: a tile set built elsewhere, such as an OverlappingModel, solved instead of the config's
+                tile set file. See Grid. It is pickled to every worker of solve_parallel
         """
-        config = configparser.ConfigParser()
-        config.read('../../settings.ini')
-        if debug: print("Creating solver...")
-
-        self.grid = Grid(get_json_path(config),
-                         int(config['grid']['GRID_DIM_WIDTH']),
-                         int(config['grid']['GRID_DIM_HEIGHT']),
-                         (config['tiles']['DIRECTIONS']).split(','),
-                         debug=debug)
-        self.fail_condition = str(config['contradiction']['FAIL_CONDITION'])
-        self.debug=debug
+        if config is None or isinstance(config, configparser.ConfigParser):
+            config = SolverConfig.from_settings(config, tile_set_name, width, height, debug)
+        if config.debug: print("Creating solver...")
+
+        self.config = config
+        self.grid = Grid(config.tile_set_filepath,
+                         config.width,
+                         config.height,
+                         config.directions,
+                         debug=config.debug,
+                         propagation_engine=config.propagation_engine,
+                         entropy_heuristic=config.entropy_heuristic,
+                         backtrack_depth=config.backtrack_depth if config.fail_condition == "BACKTRACK" else 0,
+                         seed=seed,
+                         compile_tileset=config.compile_tileset,
+                         tile_set=tile_set)
+        self.fail_condition = config.fail_condition
+        self.debug = config.debug
+        self.restarts = 0
+        self.tile_set_name = config.tile_set_name
+        self.attempt_reports = []
+        self.cache = cache
+        self.on_step = on_step
+        self.tile_set = tile_set
 
     def solve_next(self):
         """
@@ -40,6 +62,17 @@ class Solver:
             False if the collapse contradicted
             True if the collapse was successful.
         """
+        start = time.perf_counter()
+        result = self.collapse_step()
+        stats = self.grid.stats
+        stats.steps += 1
+        stats.add_time("step", time.perf_counter() - start)
+        if self.on_step is not None:
+            self.on_step(self, result)
+        return result
+
+    def collapse_step(self):
+        """Collapses one node and handles any contradiction according to the fail condition. See solve_next."""
         # If there remains a single tile not collapsed...
         if not self.grid.finished_collapsing:
             collapsed = self.grid.collapse_node()
@@ -51,13 +84,163 @@ class Solver:
                     return False
                 elif self.fail_condition == "RESET":
                     print(f"Resetting collapse")
+                    self.restarts += 1
                     self.reset()
                     return False
                 elif self.fail_condition == "RESET_FROM_FAIL":
                     print(f"Resetting collapse from failure cell...")
+                    self.restarts += 1
                     self.reset()
                     self.grid.collapse_node(coordinates=(collapsed.x, collapsed.y))
                     return False
+                elif self.fail_condition == "BACKTRACK":
+                    if self.grid.backtrack():
+                        print(f"Backtracked collapse")
+                        return True
+                    print(f"Backtrack limit reached, resetting collapse")
+                    self.restarts += 1
+                    self.reset()
+                    return False
+        return True
+
+    def solve(self, seed=None):
+        """
+        Solves the whole grid, following the fail condition whenever a contradiction is found.
+        Parameters:
+            seed: if given, the grid is reseeded and reset first, so the result depends only on the seed. Only these
+                solves are looked up in and stored to the cache.
+        Return:
+            True if the grid was solved
+            False if the collapse contradicted and the fail condition ended it.
+        """
+        key, cached = self.start(seed)
+        if cached:
+            return True
+        while not self.is_solved():
+            self.solve_next()
+        if key is not None and not self.grid.failed_collapsing:
+            self.cache.put(key, self.grid.wave.tile_indexes())
+        return not self.grid.failed_collapsing
+
+    def start(self, seed=None):
+        """Prepares to solve the grid, as described in solve: with a seed, the grid is loaded from the cache or
+        reseeded and reset.
+        Return:
+            (cache key to store the solved grid under or None, whether the grid was loaded from the cache)"""
+        if seed is None:
+            return None, False
+        self.restarts = 0
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(self.grid, seed, self.fail_condition)
+            tile_indexes = self.cache.get(key)
+            if tile_indexes is not None:
+                self.grid.load_tile_indexes(tile_indexes)
+                return key, True
+        self.grid.set_seed(seed)
+        self.reset()
+        return key, False
+
+    def solve_slice(self, max_steps, max_seconds=None):
+        """
+        Takes up to max_steps steps, stopping early once the grid is solved or max_seconds have passed.
+        Return:
+            the number of steps taken.
+        """
+        deadline = None if max_seconds is None else time.perf_counter() + max_seconds
+        steps = 0
+        while steps < max_steps and not self.is_solved():
+            self.solve_next()
+            steps += 1
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        return steps
+
+    async def solve_async(self, seed=None, steps_per_slice=64, seconds_per_slice=None, deltas=False,
+                          executor=None):
+        """
+        Solves the grid in slices of a few steps, handing control back to the event loop between them, so many
+        solvers can share one event loop without blocking it or starving each other. Iterate it with async for:
+            async for progress in solver.solve_async(seed=0):
+                ...
+        Cancelling the task iterating it, or leaving the loop early, stops the solve between two slices, leaving the
+        grid part way collapsed.
+        Parameters:
+            seed: as in solve
+            steps_per_slice: most steps taken before control is handed back
+            seconds_per_slice: if given, a slice also ends once it has run this long
+            deltas: whether to report the cells each slice changed, from the grid's change journal
+            executor: if given, slices run on this concurrent.futures executor instead of on the event loop. A
+                cancelled slice still runs to its end there, but nothing after it does
+        Yield:
+            after every slice, a dict of the steps it took, how many cells are collapsed out of how many, restarts,
+            whether the grid is finished and whether it is solved, and under changes, the cells changed as returned
+            by Grid.take_changes, or None if every cell changed or deltas is False.
+        """
+        # Imported here, as for save_image, so solvers that are never run asynchronously start faster
+        import asyncio
+        if steps_per_slice < 1:
+            raise ValueError("steps_per_slice must be at least 1")
+        if deltas:
+            self.grid.enable_journal()
+        key, cached = self.start(seed)
+        loop = asyncio.get_running_loop()
+        while True:
+            if self.is_solved():
+                steps = 0
+            elif executor is None:
+                steps = self.solve_slice(steps_per_slice, seconds_per_slice)
+            else:
+                steps = await loop.run_in_executor(executor, self.solve_slice, steps_per_slice, seconds_per_slice)
+            finished = self.is_solved()
+            solved = finished and not self.grid.failed_collapsing
+            if solved and key is not None and not cached:
+                self.cache.put(key, self.grid.wave.tile_indexes())
+            wave = self.grid.wave
+            yield {"steps": steps, "collapsed": wave.collapsed.count(1), "cells": wave.size,
+                   "restarts": self.restarts, "finished": finished, "solved": solved,
+                   "changes": self.grid.take_changes() if deltas else None}
+            if finished:
+                return
+            await asyncio.sleep(0)
+
+    def solve_parallel(self, attempts=None, seed=0):
+        """
+        Races independent attempts at solving the grid across CPU cores, each with a different seed, and keeps the
+        first attempt that finishes without a contradiction. The other attempts are stopped.
+        Useful for hard tile sets, where a single attempt may reset many times before it succeeds.
+        Parameters:
+            attempts: number of worker processes to race. Defaults to one per CPU
+            seed: seed of the first worker. Worker i starts from seed + i
+        Return:
+            True if an attempt solved the grid, which is copied onto this solver's grid
+            False if every attempt ended on a contradiction.
+        """
+        from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+        import multiprocessing
+        attempts = attempts or os.cpu_count()
+        winner = None
+        reports = []
+        with multiprocessing.Manager() as manager, ProcessPoolExecutor(max_workers=attempts) as executor:
+            stop = manager.Event()
+            pending = {executor.submit(run_attempt, self.config, worker, seed, attempts, stop, self.tile_set)
+                       for worker in range(attempts)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    report = future.result()
+                    reports.append(report)
+                    if report["solved"] and winner is None:
+                        winner = report
+                        stop.set()
+
+        self.attempt_reports = sorted(reports, key=lambda report: report["worker"])
+        for report in self.attempt_reports:
+            outcome = f"solved with seed {report['seed']}" if report is winner else "stopped"
+            print(f"worker {report['worker']}: {report['attempts']} attempts, {report['restarts']} restarts, {outcome}")
+        if winner is None:
+            return False
+        self.grid.load_tile_indexes(winner["tile_indexes"])
         return True
 
     def reset(self):
@@ -67,6 +250,15 @@ class Solver:
         return self.grid.reset()
 
     #get/set
+    def stats(self):
+        """Returns a snapshot of the solver's counters and timers: the grid's SolverStats, which last across resets,
+        and the number of restarts.
+        Returns:
+            dict of counter name -> count, with the seconds spent in each phase under phase_seconds."""
+        snapshot = self.grid.stats.snapshot()
+        snapshot["restarts"] = self.restarts
+        return snapshot
+
     def is_solved(self):
         """Returns whether the solver has finished collapsing the grid."""
         return self.grid.finished_collapsing
@@ -79,11 +271,89 @@ class Solver:
         """Return the dimensions of the grid."""
         return self.grid.width, self.grid.height
 
-if __name__ == "__main__":
-    solver = Solver()
-    while not solver.is_solved():
-        solver.solve_next()
-        solver.get_grid()
+    def save_image(self, path, cell_size=16):
+        """Renders the grid's current state to a PNG or WebP image. Needs Pillow and NumPy, which are only imported
+        here so the solver itself does not depend on them.
+        Returns:
+            the path written to."""
+        from app.pillow.renderer import render_grid
+        render_grid(self.grid, path, cell_size)
+        return path
+
+    def record(self, path, every=1, cell_size=8, duration=40, seed=None):
+        """Solves the grid while recording the collapse to an animated GIF, or APNG for .png and .apng paths.
+        Parameters:
+            every: a frame is written every this many steps
+            duration: how long each frame is shown, in milliseconds
+            seed: if given, the grid is reseeded and reset first
+        Returns:
+            True if the grid was solved
+            False if the collapse contradicted and the fail condition ended it."""
+        from app.pillow.recorder import record_solve
+        return record_solve(self, path, every, cell_size, duration, seed)
+
+def run_attempt(config, worker, seed, stride, stop, tile_set=None):
+    """
+    Worker process for Solver.solve_parallel. Solves with seeds seed + worker, seed + worker + stride, ... until one
+    succeeds or another worker has already succeeded. tile_set is the solver's own tile set, if it was given one.
+    Return:
+        dict reporting the worker's attempts and restarts, and the solved grid's tile indexes if it succeeded.
+    """
+    # The solver reports every contradiction to stdout, which only the main process should be writing to
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        return attempt_seeds(config, worker, seed, stride, stop, tile_set)
+
+
+def attempt_seeds(config, worker, seed, stride, stop, tile_set=None):
+    """Does the work of run_attempt, printing as the solver does."""
+    solver = Solver(config=config, tile_set=tile_set)
+    seed += worker
+    report = {"worker": worker, "seed": seed, "attempts": 0, "restarts": 0,
+              "solved": False, "tile_indexes": None}
+    while not stop.is_set():
+        report["attempts"] += 1
+        solver.grid.set_seed(seed)
+        solver.reset()
+        steps = 0
+        while not solver.is_solved() and (steps % 64 or not stop.is_set()):
+            solver.solve_next()
+            steps += 1
+        report["restarts"] = solver.restarts
+        if solver.is_solved() and not solver.grid.failed_collapsing:
+            report["seed"] = seed
+            report["solved"] = True
+            report["tile_indexes"] = solver.grid.wave.tile_indexes()
+            return report
+        seed += stride
+    return report
+
+
+def main(argv=None):
+    import argparse
+    from app.solver.profiling import Profiler, format_stats
+    parser = argparse.ArgumentParser(description="Solve the grid described by settings.ini and print it.")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--stats", action="store_true", help="print the solver's counters and timers when done")
+    parser.add_argument("--profile", action="store_true", help="profile the solve with cProfile")
+    parser.add_argument("--trace-memory", action="store_true", help="trace memory allocations with tracemalloc")
+    parser.add_argument("--profile-output", default=None, help="also write the cProfile profile to this file")
+    args = parser.parse_args(argv)
+    solver = Solver(seed=args.seed)
+    profiler = Profiler(cpu=args.profile, memory=args.trace_memory)
+    with profiler if args.profile or args.trace_memory else nullcontext():
+        while not solver.is_solved():
+            solver.solve_next()
+            solver.get_grid()
     for row in solver.grid.grid:
         for node in row:
-            print(node)
\ No newline at end of file
+            print(node)
+    if args.stats or args.profile or args.trace_memory:
+        print(format_stats(solver.stats()))
+    if args.profile or args.trace_memory:
+        print(profiler.report())
+    if args.profile_output and profiler.save(args.profile_output):
+        print(f"Wrote {args.profile_output}")
+
+
+if __name__ == "__main__":
+    main()
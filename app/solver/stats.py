@@ -0,0 +1,54 @@
+from contextlib import contextmanager
+import time
+
+
+class SolverStats:
+    """
+    Counters and timers of the work done while solving a grid, to tell where the time of a slow solve goes.
+    One instance is shared by a grid and the propagation engines it builds, and lives across resets.
+    """
+    COUNTERS = ("steps", "collapses", "propagations", "cells_visited", "tiles_banned", "contradictions", "resets",
+                "backtracks")
+
+    def __init__(self):
+        """
+            steps: solver steps taken
+            collapses: nodes collapsed to a single tile
+            propagations: times a change was propagated through the wave
+            cells_visited: cells taken off a propagation worklist
+            tiles_banned: tile options removed from cells by propagation
+            contradictions: collapses or propagations that left a cell with no options
+            resets: times the grid was reset
+            backtracks: decisions undone by backtracking
+            worklist_peak: largest a propagation worklist has been
+            phase_seconds: phase name -> total time spent in it, in seconds
+        """
+        self.clear()
+
+    def clear(self):
+        """Sets every counter and timer back to zero."""
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        self.worklist_peak = 0
+        self.phase_seconds = dict()
+
+    def add_time(self, phase, seconds):
+        """Adds to the time spent in a phase."""
+        self.phase_seconds[phase] = self.phase_seconds.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def timer(self, phase):
+        """Times the body of a with statement as part of a phase. Meant for coarse phases such as rendering; the
+        solver's own phases are timed inline."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - start)
+
+    def snapshot(self):
+        """Returns a copy of every counter and timer, as a dict."""
+        snapshot = {name: getattr(self, name) for name in self.COUNTERS}
+        snapshot["worklist_peak"] = self.worklist_peak
+        snapshot["phase_seconds"] = dict(self.phase_seconds)
+        return snapshot
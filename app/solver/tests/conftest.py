@@ -0,0 +1,22 @@
+import atexit
+import shutil
+import tempfile
+from functools import cache
+from pathlib import Path
+from ..settings import ROOT_PATH
+
+DIRECTIONS = ['up', 'right', 'down', 'left']
+
+
+@cache
+def base_tiles_copy():
+    """Returns a temporary copy of base_tiles, so grids compiling their tile sets never write into the repo."""
+    folder = Path(tempfile.mkdtemp()) / "base_tiles"
+    shutil.copytree(ROOT_PATH / "base_tiles", folder, ignore=shutil.ignore_patterns("*.compiled"))
+    atexit.register(shutil.rmtree, folder.parent, ignore_errors=True)
+    return folder
+
+
+def tile_set_path(tile_set_name):
+    """Returns the path of a tile set in the copy of base_tiles, independent of the working directory."""
+    return str(base_tiles_copy() / tile_set_name / f"{tile_set_name}.json")
@@ -0,0 +1,25 @@
+import contextlib
+import io
+import json
+from app.batch.batch import run_batch
+
+
+def test_run_batch_writes_grids_and_uses_cache(tmp_path):
+    output, cache = tmp_path / "batch", tmp_path / "cache"
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = run_batch("circles", 6, 5, 2, 10, str(output), workers=1, cache_dir=str(cache),
+                             compile_tileset=False)
+    assert sorted(result["seed"] for result in results) == [10, 11]
+    assert all(result["solved"] and not result["cached"] for result in results)
+    for result in results:
+        with open(result["path"]) as file:
+            data = json.load(file)
+        assert (data["seed"], data["width"], data["height"]) == (result["seed"], 6, 5)
+        assert len(data["grid"]) == 30 and all(0 <= index < len(data["tiles"]) for index in data["grid"])
+        assert {"id", "rotations"} == set(data["tiles"][0])
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        again = run_batch("circles", 6, 5, 2, 10, str(output), workers=1, cache_dir=str(cache),
+                             compile_tileset=False)
+    assert all(result["cached"] for result in again)
+    assert {result["path"] for result in again} == {result["path"] for result in results}
@@ -0,0 +1,24 @@
+from .conftest import tile_set_path
+from ..settings import SolverConfig
+from app.benchmark.benchmark import benchmark_case, compare
+
+
+def test_benchmark_case():
+    config = SolverConfig(tile_set_path("circles"), 4, 4)
+    result = benchmark_case(config, seeds=[0, 1], repeat=1)
+    assert result["tile_set"] == "circles"
+    assert result["solved"] == 2
+    assert [run["seed"] for run in result["runs"]] == [0, 1]
+    for run in result["runs"]:
+        assert run["steps"] > 0
+        assert run["propagate_calls"] > 0
+        assert run["peak_memory_bytes"] > 0
+
+
+def test_compare_flags_regressions():
+    baseline = {"results": [{"tile_set": "circles", "width": 8, "height": 8,
+                             "solve_seconds": 1.0, "steps_per_second": 100.0}]}
+    report = {"results": [{"tile_set": "circles", "width": 8, "height": 8,
+                           "solve_seconds": 1.1, "steps_per_second": 50.0}]}
+    assert compare(report, baseline, threshold=0.2) == [("circles", 8, 8, "steps_per_second", 100.0, 50.0)]
+    assert compare(baseline, baseline) == []
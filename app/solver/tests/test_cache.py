@@ -0,0 +1,56 @@
+import os
+from ..cache import ResultCache
+from ..grid import Grid
+from ..settings import SolverConfig
+from ..solver import Solver
+from .conftest import DIRECTIONS, tile_set_path
+
+
+def test_cache_round_trip(tmp_path):
+    cache = ResultCache(tmp_path)
+    assert cache.get("missing") is None
+    cache.put("grid", [3, 0, 12, 7])
+    assert cache.get("grid") == [3, 0, 12, 7]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=3 * 4 * 10)
+    for age, key in enumerate(["first", "third", "second"]):
+        cache.put(key, list(range(10)))
+        # Space the access times out, file times may be too coarse to order writes this close together
+        os.utime(cache.path(key), (1000 - age, 1000 - age))
+    cache.max_bytes = 2 * 4 * 10
+    cache.evict()
+    assert cache.get("second") is None
+    assert cache.get("first") == list(range(10))
+    assert cache.get("third") == list(range(10))
+
+
+def test_cache_key():
+    grid = Grid(tile_set_path("circles"), 6, 6, DIRECTIONS)
+    other = Grid(tile_set_path("circles"), 6, 7, DIRECTIONS)
+    assert ResultCache.key(grid, 0) == ResultCache.key(grid, 0)
+    assert ResultCache.key(grid, 0) != ResultCache.key(grid, 1)
+    assert ResultCache.key(grid, 0) != ResultCache.key(other, 0)
+    # Keys follow the tiles the tile indexes refer to, not only the tile set file
+    key = ResultCache.key(grid, 0)
+    grid.all_tiles = grid.all_tiles[:-1]
+    assert ResultCache.key(grid, 0) != key
+
+
+def test_solver_uses_cache(tmp_path):
+    cache = ResultCache(tmp_path)
+    solver = Solver(config=SolverConfig(tile_set_path("circles"), 8, 8), cache=cache)
+    assert solver.solve(seed=3)
+    tile_indexes = solver.grid.wave.tile_indexes()
+    assert cache.misses == 1
+
+    assert solver.solve(seed=3)
+    assert cache.hits == 1
+    assert solver.grid.wave.tile_indexes() == tile_indexes
+
+    # Without the cache, the same seed solves to the same grid
+    uncached = Solver(config=SolverConfig(tile_set_path("circles"), 8, 8))
+    assert uncached.solve(seed=3)
+    assert uncached.grid.wave.tile_indexes() == tile_indexes
@@ -0,0 +1,54 @@
+import pytest
+from ..chunks import ChunkedWorld
+from .conftest import DIRECTIONS, tile_set_path
+
+
+def assert_valid_region(world, width, height):
+    for x in range(width):
+        for y in range(height):
+            tile = world.tile_at(x, y)
+            assert world.tile_at(x + 1, y) in tile.valid_neighbors['right']
+            assert world.tile_at(x, y + 1) in tile.valid_neighbors['down']
+
+
+@pytest.mark.parametrize("propagation_engine", ["AC3", "AC4"])
+def test_chunked_world_seams(propagation_engine):
+    world = ChunkedWorld(tile_set_path("circles"), 6, 5, DIRECTIONS, seed=3,
+                         propagation_engine=propagation_engine)
+    coordinates = [(cx, cy) for cx in range(3) for cy in range(3)]
+    finished = [coordinate for coordinate, chunk in world.generate(coordinates)]
+    assert finished == coordinates
+    assert_valid_region(world, 17, 14)
+
+
+def test_chunked_world_negative_coordinates():
+    world = ChunkedWorld(tile_set_path("circles"), 4, 4, DIRECTIONS)
+    tile = world.tile_at(-1, -1)
+    assert tile in world.tile_at(-2, -1).valid_neighbors['right']
+    assert tile in world.tile_at(-1, 0).valid_neighbors['up']
+    assert (-1, -1) in world.chunks
+
+
+def test_chunked_world_eviction_keeps_seams():
+    world = ChunkedWorld(tile_set_path("circles"), 5, 5, DIRECTIONS, max_chunks=2)
+    first = world.get_chunk(0, 0)
+    world.get_chunk(1, 0)
+    world.get_chunk(0, 1)
+    assert len(world.chunks) == 2
+    assert (0, 0) not in world.chunks
+    regenerated = world.get_chunk(0, 0)
+    for cells in world.edge_cells.values():
+        assert [regenerated[index] for index in cells] == [first[index] for index in cells]
+    assert_valid_region(world, 9, 9)
+
+
+def test_chunked_world_memory_is_bounded():
+    world = ChunkedWorld(tile_set_path("circles"), 4, 4, DIRECTIONS, max_chunks=2, max_edges=3)
+    for cx in range(10):
+        world.get_chunk(cx, 0)
+    assert list(world.chunks) == [(8, 0), (9, 0)]
+    assert list(world.edges) == [(7, 0), (8, 0), (9, 0)]
+    world.get_chunk(8, 0)
+    world.get_chunk(10, 0)
+    assert list(world.edges) == [(9, 0), (8, 0), (10, 0)]
+    assert_valid_region(world, 3 * 4, 4)
@@ -0,0 +1,69 @@
+import json
+import os
+import shutil
+from pathlib import Path
+import pytest
+from ..compiled_tileset import compiled_path, load_compiled_tileset
+from ..grid import Grid
+from ..settings import ROOT_PATH
+from .conftest import DIRECTIONS
+
+
+@pytest.fixture
+def setup_tile_set(tmp_path):
+    # Work on a copy of the circles tile set with a constraint, so the compiled file is written outside the repo
+    folder = tmp_path / "circles"
+    shutil.copytree(ROOT_PATH / "base_tiles" / "circles", folder)
+    path = folder / "circles.json"
+    data = json.loads(path.read_text())
+    data["constraints"] = [{"tile_id": 2, "rotations": 1, "nodes_to_constrain": [[0, 0], [3, 2]]}]
+    path.write_text(json.dumps(data))
+    for compiled in folder.glob("*.compiled"):
+        compiled.unlink()
+    yield str(path)
+
+
+def test_grid_compiles_tile_set(setup_tile_set):
+    assert load_compiled_tileset(setup_tile_set, DIRECTIONS) is None
+    parsed = Grid(setup_tile_set, 5, 5, DIRECTIONS)
+    assert parsed.base_tiles is not None
+    assert os.path.exists(compiled_path(setup_tile_set))
+
+    loaded = Grid(setup_tile_set, 5, 5, DIRECTIONS)
+    assert loaded.base_tiles is None
+    assert [(tile.id, tile.rotations, tile.sides, tile.weight) for tile in loaded.all_tiles] == \
+           [(tile.id, tile.rotations, tile.sides, tile.weight) for tile in parsed.all_tiles]
+    assert [os.path.basename(tile.image_path) for tile in loaded.all_tiles] == \
+           [os.path.basename(tile.image_path) for tile in parsed.all_tiles]
+    assert loaded.propagator.masks == parsed.propagator.masks
+    assert {(tile.id, tile.rotations): coordinates for tile, coordinates in loaded.constraints.items()} == \
+           {(2, 1): [(0, 0), (3, 2)]}
+    assert loaded.grid[3][2].tile.id == 2 and loaded.grid[3][2].tile.rotations == 1
+
+    tile = loaded.all_tiles[0]
+    assert {neighbor.id for neighbor in tile.valid_neighbors['up']} == \
+           {neighbor.id for neighbor in parsed.all_tiles[0].valid_neighbors['up']}
+
+
+def test_compiled_tile_set_invalidated(setup_tile_set):
+    Grid(setup_tile_set, 5, 5, DIRECTIONS)
+    assert load_compiled_tileset(setup_tile_set, DIRECTIONS) is not None
+    assert load_compiled_tileset(setup_tile_set, ['up', 'down', 'left', 'right']) is None
+
+    image = Path(setup_tile_set).parent / "b.png"
+    image.write_bytes(image.read_bytes() + b'\0')
+    assert load_compiled_tileset(setup_tile_set, DIRECTIONS) is None
+    Grid(setup_tile_set, 5, 5, DIRECTIONS)
+    assert load_compiled_tileset(setup_tile_set, DIRECTIONS) is not None
+
+    path = Path(setup_tile_set)
+    data = json.loads(path.read_text())
+    data["tile_set"][0]["weight"] = 5
+    path.write_text(json.dumps(data))
+    assert load_compiled_tileset(setup_tile_set, DIRECTIONS) is None
+
+
+def test_grid_without_compiling(setup_tile_set):
+    grid = Grid(setup_tile_set, 5, 5, DIRECTIONS, compile_tileset=False)
+    assert grid.base_tiles is not None
+    assert not os.path.exists(compiled_path(setup_tile_set))
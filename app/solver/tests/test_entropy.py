@@ -0,0 +1,78 @@
+import pytest
+from ..wave import Wave
+from ..entropy import EntropyIndex, WeightedEntropyIndex
+
+
+class FakeTile:
+    def __init__(self, ext_id, weight=1):
+        self.id = ext_id
+        self.weight = weight
+        self.rotations = 0
+
+
+@pytest.fixture
+def setup_wave():
+    tiles = [FakeTile(i) for i in range(4)]
+    wave = Wave(3, 3, tiles, ['up', 'right', 'down', 'left'])
+    yield wave
+
+
+def test_entropy_index_all_tied(setup_wave):
+    entropy = EntropyIndex(setup_wave)
+    assert sorted(entropy.lowest_all()) == list(range(9))
+    assert entropy.lowest() in range(9)
+
+
+def test_entropy_index_tracks_changes(setup_wave):
+    entropy = EntropyIndex(setup_wave)
+    setup_wave.set_mask(4, 0b11)
+    setup_wave.set_mask(7, 0b11)
+    assert sorted(entropy.lowest_all()) == [4, 7]
+    setup_wave.set_mask(7, 0b1)
+    assert entropy.lowest() == 7
+    setup_wave.set_collapsed(7, 0)
+    assert entropy.lowest() == 4
+
+
+def test_entropy_index_all_collapsed(setup_wave):
+    entropy = EntropyIndex(setup_wave)
+    for index in range(setup_wave.size):
+        setup_wave.set_collapsed(index, 0)
+    assert entropy.lowest() is None
+    assert entropy.lowest_all() == []
+
+
+def test_entropy_index_random_ties(setup_wave):
+    chosen = set()
+    for _ in range(200):
+        entropy = EntropyIndex(setup_wave)
+        chosen.add(entropy.lowest())
+        setup_wave.observers.clear()
+    assert len(chosen) > 1
+
+
+def test_weighted_entropy_index():
+    tiles = [FakeTile(0, weight=10)] + [FakeTile(i) for i in range(1, 4)]
+    wave = Wave(3, 3, tiles, ['up', 'right', 'down', 'left'])
+    entropy = WeightedEntropyIndex(wave)
+    # Two options of weights 10 and 1 are less uncertain than two options of weight 1
+    wave.set_mask(2, 0b0011)
+    wave.set_mask(5, 0b0110)
+    assert entropy.lowest() == 2
+    assert entropy.weight_sums[2] == 11.0
+    wave.set_mask(2, 0b0001)
+    assert entropy.weight_sums[2] == 10.0
+    assert entropy.entropy(2) == 0.0
+    wave.set_mask(2, 0)
+    assert entropy.entropy(2) < 0
+
+
+def test_weighted_entropy_index_zero_weights():
+    tiles = [FakeTile(0, weight=0), FakeTile(1, weight=0), FakeTile(2, weight=3)]
+    wave = Wave(2, 2, tiles, ['up', 'right', 'down', 'left'])
+    entropy = WeightedEntropyIndex(wave)
+    wave.set_mask(1, 0b011)
+    wave.set_mask(2, 0b001)
+    assert entropy.entropy(1) == 2.0
+    assert entropy.entropy(2) == 1.0
+    assert entropy.lowest() in range(4)
@@ -0,0 +1,170 @@
+import json
+import shutil
+import pytest
+from ..grid import Grid
+from ..settings import ROOT_PATH
+from .conftest import DIRECTIONS, tile_set_path
+
+
+def assert_valid_solution(grid):
+    for x in range(grid.width):
+        for y in range(grid.height):
+            tile = grid.grid[x][y].tile
+            assert tile is not None
+            assert grid.grid[(x + 1) % grid.width][y].tile in tile.valid_neighbors['right']
+            assert grid.grid[x][(y + 1) % grid.height].tile in tile.valid_neighbors['down']
+
+
+def solve(grid, backtrack=False):
+    while not grid.is_finished_collapsing() or grid.failed_collapsing:
+        if grid.failed_collapsing and not (backtrack and grid.backtrack()):
+            grid.reset()
+        grid.collapse_node()
+
+
+@pytest.mark.parametrize("propagation_engine", ["AC3", "AC4"])
+@pytest.mark.parametrize("entropy_heuristic", ["COUNT", "SHANNON"])
+def test_grid_solves(propagation_engine, entropy_heuristic):
+    grid = Grid(tile_set_path("circles"), 12, 10, DIRECTIONS,
+                seed=0, propagation_engine=propagation_engine, entropy_heuristic=entropy_heuristic)
+    solve(grid)
+    assert_valid_solution(grid)
+
+
+def test_grid_lowest_entropy_nodes():
+    grid = Grid(tile_set_path("circles"), 5, 5, DIRECTIONS, seed=0)
+    assert len(grid.get_lowest_entropy_nodes()) == 25
+    node = grid.collapse_node()
+    lowest_entropy_nodes = grid.get_lowest_entropy_nodes()
+    assert node not in lowest_entropy_nodes
+    assert len({len(node.get_tile_options()) for node in lowest_entropy_nodes}) == 1
+
+
+@pytest.mark.parametrize("propagation_engine", ["AC3", "AC4"])
+def test_grid_backtrack(propagation_engine):
+    grid = Grid(tile_set_path("grass_tiles"), 20, 20, DIRECTIONS,
+                seed=1, propagation_engine=propagation_engine, backtrack_depth=50)
+    solve(grid, backtrack=True)
+    assert_valid_solution(grid)
+    assert len(grid.decisions) <= 50
+
+
+def test_grid_backtrack_restores_wave():
+    grid = Grid(tile_set_path("circles"), 6, 6, DIRECTIONS, seed=0, backtrack_depth=10)
+    cells = list(grid.wave.cells)
+    node = grid.collapse_node()
+    tile_index = node.get_tile_mask().bit_length() - 1
+    assert grid.backtrack()
+    assert not node.is_collapsed()
+    assert node.get_tile_mask() == cells[node.index] & ~(1 << tile_index)
+
+
+def test_grid_load_tile_indexes():
+    solved = Grid(tile_set_path("circles"), 6, 6, DIRECTIONS, seed=0)
+    solve(solved)
+    grid = Grid(tile_set_path("circles"), 6, 6, DIRECTIONS)
+    grid.load_tile_indexes(solved.wave.tile_indexes())
+    assert grid.is_finished_collapsing()
+    assert grid.wave.tile_indexes() == solved.wave.tile_indexes()
+    assert_valid_solution(grid)
+
+
+def test_grid_seed_is_reproducible():
+    first = Grid(tile_set_path("circles"), 8, 8, DIRECTIONS, seed=5)
+    solve(first)
+    second = Grid(tile_set_path("circles"), 8, 8, DIRECTIONS, seed=4)
+    second.set_seed(5)
+    second.reset()
+    solve(second)
+    assert second.wave.tile_indexes() == first.wave.tile_indexes()
+
+
+def test_grid_change_journal():
+    grid = Grid(tile_set_path("circles"), 6, 6, DIRECTIONS, seed=0, backtrack_depth=10)
+    assert grid.take_changes() is None
+    grid.enable_journal(domains=True)
+    cells = list(grid.wave.cells)
+    node = grid.collapse_node()
+    changes = grid.take_changes()
+    assert changes[0][:2] == (node.x, node.y)
+    assert len({(x, y) for x, y, _, _ in changes}) == len(changes)
+    for x, y, old_mask, new_mask in changes:
+        index = grid.wave.index(x, y)
+        assert old_mask == cells[index]
+        assert new_mask == grid.wave.cells[index]
+    assert grid.take_changes() == []
+
+    assert grid.backtrack()
+    assert {(x, y) for x, y, _, _ in grid.take_changes()} >= {(node.x, node.y)}
+
+    grid.reset()
+    assert grid.take_changes() is None
+    grid.collapse_node()
+    assert grid.take_changes()
+
+
+def test_symmetric_rotations_are_merged(tmp_path):
+    folder = tmp_path / "symmetric"
+    shutil.copytree(ROOT_PATH / "base_tiles" / "tests", folder)
+    data = json.loads((folder / "tests.json").read_text())
+    blank, t, b_i = data["tile_set"][:3]
+    # A blank tile declared with 4 rotations, and a tile whose sockets, but not its declared symmetry, are symmetric
+    blank.update(number_of_rotations=4, weight=2, symmetry=1)
+    b_i.update(sides={"UP": "0", "RIGHT": "0", "DOWN": "0", "LEFT": "0"})
+    data["tile_set"] = [blank, t, b_i]
+    data["constraints"] = [{"tile_id": 1, "rotations": 3, "nodes_to_constrain": [[1, 1]]}]
+    (folder / "tests.json").write_text(json.dumps(data))
+
+    grid = Grid(str(folder / "tests.json"), 4, 4, DIRECTIONS, compile_tileset=False)
+    assert grid.merged_tiles == 3
+    assert [(tile.id, tile.rotations, tile.weight) for tile in grid.all_tiles] == \
+           [(1, 0, 8), (2, 0, 1), (2, 1, 1), (2, 2, 1), (2, 3, 1), (3, 0, 1), (3, 1, 1)]
+    # A constraint on a merged rotation applies to the tile it was merged into
+    assert grid.grid[1][1].tile is grid.all_tiles[0]
+
+
+def test_region_constraints(tmp_path):
+    folder = tmp_path / "regions"
+    shutil.copytree(ROOT_PATH / "base_tiles" / "circles", folder)
+    (folder / "circles.compiled").unlink(missing_ok=True)
+    data = json.loads((folder / "circles.json").read_text())
+    data["region_constraints"] = [
+        {"border": 1, "edges": ["up", "down"], "tiles": [1]},
+        {"rect": [4, 3, 2, 2], "tiles": [{"tile_id": 5, "rotations": 0}]},
+    ]
+    (folder / "circles.json").write_text(json.dumps(data))
+
+    for compile_tileset in (True, True, False):
+        grid = Grid(str(folder / "circles.json"), 10, 8, DIRECTIONS, seed=0, compile_tileset=compile_tileset)
+        assert [(region, sorted((tile.id, tile.rotations) for tile in tiles))
+                for region, tiles in grid.region_constraints] == \
+               [({"border": 1, "edges": ["up", "down"]}, [(1, 0)]), ({"rect": [4, 3, 2, 2]}, [(5, 0)])]
+    # Every region is narrowed before a single propagation
+    assert grid.stats.propagations == 1
+    solve(grid)
+    assert_valid_solution(grid)
+    assert all(grid.grid[x][y].tile.id == 1 for x in range(10) for y in (0, 7))
+    assert all(grid.grid[x][y].tile.id == 5 for x in (4, 5) for y in (3, 4))
+
+
+@pytest.mark.parametrize("propagation_engine", ["AC3", "AC4"])
+def test_grid_reset_restores_snapshot(propagation_engine):
+    grid = Grid(tile_set_path("circles"), 9, 7, DIRECTIONS, seed=0, propagation_engine=propagation_engine)
+    grid.add_region_constraint({"border": 1}, [grid.all_tiles[0]])
+    grid.reset(rebuild=True)
+    wave, engine, nodes = grid.wave, grid.engine, grid.grid
+    initial_cells = list(wave.cells)
+    initial_counts = list(getattr(engine, "counts", []))
+    for _ in range(10):
+        grid.collapse_node()
+    propagations = grid.stats.propagations
+    grid.reset()
+    # The same wave, engine and nodes are put back as they were, without propagating the constraints again
+    assert grid.wave is wave and grid.engine is engine and grid.grid is nodes
+    assert wave.cells == initial_cells
+    assert not any(wave.collapsed)
+    assert list(getattr(engine, "counts", [])) == initial_counts
+    assert grid.stats.propagations == propagations
+    solve(grid)
+    assert_valid_solution(grid)
+    assert all(grid.grid[x][y].tile is grid.all_tiles[0] for x in range(9) for y in (0, 6))
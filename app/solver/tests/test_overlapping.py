@@ -0,0 +1,78 @@
+import contextlib
+import io
+import pytest
+from ..settings import SolverConfig
+from ..solver import Solver
+
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture
+def sample_path(tmp_path):
+    """A 16x16 sample of black walls on white, with one red door."""
+    pixels = np.full((16, 16, 3), 255, dtype=np.uint8)
+    pixels[::4, :] = 0
+    pixels[:, ::4] = 0
+    pixels[4, 5:7] = (255, 0, 0)
+    path = tmp_path / "sample.png"
+    Image.fromarray(pixels).save(path)
+    return str(path)
+
+
+def test_patterns_are_deduplicated_and_counted(sample_path):
+    from app.overlapping.overlapping import OverlappingModel
+    model = OverlappingModel(sample_path, n=3, symmetry=1)
+    # Every position of the periodic sample is one occurrence
+    assert model.counts.sum() == 16 * 16
+    assert len(model.patterns) == len(model.tiles) < 16 * 16
+    assert [tile.weight for tile in model.tiles] == list(model.counts)
+    assert model.pattern_index(model.patterns[5]) == 5
+    # The door is only two pixels wide
+    red = [tuple(color[:3]) for color in model.colors].index((255, 0, 0))
+    assert model.pattern_index(np.full((3, 3), red)) is None
+
+    augmented = OverlappingModel(sample_path, n=3, symmetry=8)
+    assert augmented.counts.sum() == 8 * 16 * 16
+    assert len(augmented.patterns) > len(model.patterns)
+
+
+def test_compatible_patterns_overlap(sample_path):
+    from app.overlapping.overlapping import OverlappingModel
+    model = OverlappingModel(sample_path, n=3, symmetry=2)
+    patterns = model.patterns
+    right = model.propagator.masks["right"]
+    down = model.propagator.masks["down"]
+    for a in range(len(patterns)):
+        for b in range(len(patterns)):
+            assert bool(right[a] >> b & 1) == np.array_equal(patterns[a][:, 1:], patterns[b][:, :-1])
+            assert bool(down[a] >> b & 1) == np.array_equal(patterns[a][1:, :], patterns[b][:-1, :])
+
+
+def test_solve_overlapping_model(sample_path):
+    from app.overlapping.overlapping import OverlappingModel
+    model = OverlappingModel(sample_path, n=3, symmetry=8)
+    solver = Solver(config=SolverConfig(sample_path, 12, 10), tile_set=model)
+    assert solver.grid.tile_set_hash == model.hash
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert solver.solve(seed=0)
+    image = model.render(solver.grid, scale=2)
+    assert image.size == (24, 20)
+    # Every cell shows a color from the sample
+    colors = {tuple(color) for color in model.colors}
+    assert {color for _, color in image.getcolors()} <= colors
+
+
+def test_solve_overlapping_model_in_parallel(sample_path):
+    import pickle
+    from app.overlapping.overlapping import OverlappingModel
+    model = OverlappingModel(sample_path, n=3, symmetry=8)
+    copy = pickle.loads(pickle.dumps(model))
+    assert copy.propagator.masks == model.propagator.masks
+    assert [{neighbor.id for neighbor in tile.valid_neighbors["up"]} for tile in copy.tiles] == \
+           [{neighbor.id for neighbor in tile.valid_neighbors["up"]} for tile in model.tiles]
+
+    solver = Solver(config=SolverConfig(sample_path, 8, 8, fail_condition="RESET"), tile_set=model)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert solver.solve_parallel(attempts=2)
+    assert -1 not in solver.grid.wave.tile_indexes()
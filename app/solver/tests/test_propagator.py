@@ -0,0 +1,79 @@
+import pytest
+from ..tile import Tile
+from ..propagator import Propagator, AC3Engine, AC4Engine
+from ..wave import Wave
+from .conftest import DIRECTIONS
+
+
+@pytest.fixture
+def setup_tiles():
+    blank = Tile(ext_id=1, image_path="blank.png",
+                 sides={"up": "0", "right": "0", "down": "0", "left": "0"})
+    line = Tile(ext_id=2, image_path="line.png",
+                sides={"up": "0", "right": "1", "down": "0", "left": "1"})
+    tiles = [blank, line]
+    for tile in tiles:
+        tile.set_valid_neighbors(tiles)
+    yield tiles
+
+
+def test_propagator_masks(setup_tiles):
+    propagator = Propagator(setup_tiles, DIRECTIONS)
+    assert propagator.masks['up'] == [0b11, 0b11]
+    assert propagator.masks['right'] == [0b01, 0b10]
+    assert propagator.masks['left'] == [0b01, 0b10]
+
+
+def test_propagator_allowed(setup_tiles):
+    propagator = Propagator(setup_tiles, DIRECTIONS)
+    assert propagator.allowed('right', 0b01) == 0b01
+    assert propagator.allowed('right', 0b11) == 0b11
+    assert propagator.allowed('right', 0) == 0
+    assert propagator.allowed_cache['right'][0b11] == 0b11
+
+
+@pytest.mark.parametrize("engine", [AC3Engine, AC4Engine])
+def test_engine_propagate(setup_tiles, engine):
+    propagator = Propagator(setup_tiles, DIRECTIONS)
+    wave = Wave(3, 3, setup_tiles, DIRECTIONS)
+    propagation = engine(wave, propagator)
+    wave.set_collapsed(wave.index(1, 1), 1)
+    assert propagation.propagate([wave.index(1, 1)]) is None
+    # A line forces the whole row to be lines, and lines rule out blanks in the row
+    for x in range(3):
+        assert wave.cells[wave.index(x, 1)] == 0b10
+    assert wave.cells[wave.index(1, 0)] == 0b11
+
+
+@pytest.mark.parametrize("engine", [AC3Engine, AC4Engine])
+def test_engine_contradiction(setup_tiles, engine):
+    propagator = Propagator(setup_tiles, DIRECTIONS)
+    wave = Wave(3, 3, setup_tiles, DIRECTIONS)
+    propagation = engine(wave, propagator)
+    wave.set_collapsed(wave.index(0, 0), 0)
+    assert propagation.propagate([wave.index(0, 0)]) is None
+    wave.set_collapsed(wave.index(1, 0), 1)
+    assert propagation.propagate([wave.index(1, 0)]) is not None
+
+
+def test_ac4_engine_counts(setup_tiles):
+    propagator = Propagator(setup_tiles, DIRECTIONS)
+    wave = Wave(2, 2, setup_tiles, DIRECTIONS)
+    propagation = AC4Engine(wave, propagator)
+    # Blank and line both support each other up and down, but only themselves left and right
+    assert propagation.counts[0:8] == [2, 2, 1, 1, 2, 2, 1, 1]
+
+
+@pytest.mark.parametrize("engine", [AC3Engine, AC4Engine])
+def test_engine_edges_support_every_tile(engine):
+    blank = Tile(ext_id=1, image_path="blank.png", sides={"up": "0", "right": "0", "down": "0", "left": "0"})
+    # Nothing may sit above this tile, so it only fits along the top edge of a grid that does not wrap
+    top = Tile(ext_id=2, image_path="top.png", sides={"up": "9", "right": "0", "down": "0", "left": "0"})
+    tiles = [blank, top]
+    for tile in tiles:
+        tile.set_valid_neighbors(tiles)
+    wave = Wave(3, 3, tiles, DIRECTIONS, wrap=False)
+    propagation = engine(wave, Propagator(tiles, DIRECTIONS))
+    assert propagation.propagate(list(range(wave.size))) is None
+    assert [[wave.cells[wave.index(x, y)] for x in range(3)] for y in range(3)] == \
+           [[0b11, 0b11, 0b11], [0b01, 0b01, 0b01], [0b01, 0b01, 0b01]]
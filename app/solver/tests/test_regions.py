@@ -0,0 +1,24 @@
+import pytest
+from ..regions import region_cells, region_tiles
+
+
+def test_region_cells():
+    assert region_cells({"rows": [-1, -1]}, 3, 4) == [(0, 3), (1, 3), (2, 3)]
+    assert region_cells({"columns": [0, 1]}, 3, 2) == [(0, 0), (0, 1), (1, 0), (1, 1)]
+    assert region_cells({"rect": [2, -2, 5, 5]}, 4, 4) == [(2, 2), (2, 3), (3, 2), (3, 3)]
+    assert sorted(region_cells({"border": 1}, 3, 3)) == [(x, y) for x in range(3) for y in range(3) if (x, y) != (1, 1)]
+    assert region_cells({"border": 1, "edges": ["left"]}, 3, 2) == [(0, 0), (0, 1)]
+    assert region_cells({"cells": [[0, 1], [9, 9]]}, 3, 3) == [(0, 1)]
+    with pytest.raises(ValueError):
+        region_cells({"rows": [0, 0], "columns": [0, 0]}, 3, 3)
+
+
+def test_region_tiles():
+    a, b = object(), object()
+    variants = {(1, 0): a, (1, 1): b, (1, 2): a, (2, 0): b}
+    assert region_tiles({"tiles": [1]}, variants) == [a, b]
+    assert region_tiles({"tiles": [{"tile_id": 1, "rotations": 2}, 2]}, variants) == [a, b]
+    with pytest.raises(ValueError):
+        region_tiles({"tiles": [3]}, variants)
+    with pytest.raises(ValueError):
+        region_tiles({"tiles": [{"tile_id": 2, "rotations": 1}]}, variants)
@@ -0,0 +1,56 @@
+import pytest
+from .conftest import tile_set_path
+from ..settings import SolverConfig
+from ..solver import Solver
+
+Image = pytest.importorskip("PIL.Image")
+pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("extension", ["png", "webp"])
+def test_solver_save_image(tmp_path, extension):
+    solver = Solver(config=SolverConfig(tile_set_path("circles"), 6, 4))
+    assert solver.solve(seed=0)
+    path = solver.save_image(tmp_path / "images" / f"grid.{extension}", cell_size=8)
+    with Image.open(path) as image:
+        assert image.size == (48, 32)
+
+
+def test_render_partial_grid():
+    from app.pillow.renderer import GridRenderer
+    solver = Solver(config=SolverConfig(tile_set_path("circles"), 5, 5))
+    renderer = GridRenderer(solver.grid.all_tiles, 4)
+    image = renderer.render_grid(solver.grid)
+    assert image.size == (20, 20)
+    # Every cell has the same options, so they share one averaged image
+    assert len(renderer.palette) == 2
+    blank = renderer.render_tile_indexes([-1] * 25, 5, 5)
+    assert blank.getpixel((0, 0)) == renderer.background
+
+
+@pytest.mark.parametrize("extension", ["gif", "png"])
+def test_record_collapse(tmp_path, extension):
+    from app.pillow.renderer import render_grid
+    solver = Solver(config=SolverConfig(tile_set_path("circles"), 6, 4))
+    path = tmp_path / "gifs" / f"collapse.{extension}"
+    assert solver.record(str(path), every=5, cell_size=8, seed=0)
+    with Image.open(path) as image:
+        assert image.size == (48, 32)
+        assert image.n_frames > 1
+        image.seek(image.n_frames - 1)
+        last = image.convert("RGB")
+    # The partial frames add up to the solved grid. GIF frames are quantized, so only APNG compares exactly
+    if extension == "png":
+        assert last.tobytes() == render_grid(solver.grid, cell_size=8).tobytes()
+
+
+def test_record_frame_skipping(tmp_path):
+    from app.pillow.recorder import Recorder
+    solver = Solver(config=SolverConfig(tile_set_path("circles"), 6, 4))
+    recorder = Recorder(solver.grid, str(tmp_path / "collapse.png"), every=4, cell_size=4)
+    for _ in range(8):
+        solver.solve_next()
+        recorder.step()
+    # The first full frame, then one frame per four steps
+    assert recorder.frames == 3
+    recorder.close()
@@ -0,0 +1,43 @@
+import subprocess
+import sys
+from pathlib import Path
+from ..settings import SolverConfig, ROOT_PATH, read_settings
+from ..solver import Solver
+from .conftest import tile_set_path
+
+
+def test_solver_config_from_settings():
+    config = read_settings()
+    solver_config = SolverConfig.from_settings(config, tile_set_name="circles", width=7, height=5)
+    assert Path(solver_config.tile_set_filepath) == ROOT_PATH / "base_tiles" / "circles" / "circles.json"
+    assert (solver_config.width, solver_config.height) == (7, 5)
+    assert solver_config.directions == config['tiles']['DIRECTIONS'].split(',')
+    assert solver_config.fail_condition == config['contradiction']['FAIL_CONDITION']
+    assert solver_config.tile_set_name == "circles"
+    assert solver_config.copy(width=3).width == 3
+
+
+def test_solver_from_config_in_any_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = SolverConfig(tile_set_path("circles"), 6, 6)
+    solver = Solver(config=config)
+    assert solver.solve(seed=0)
+    assert Path(solver.grid.all_tiles[0].image_path).exists()
+
+
+def test_solver_imports_no_gui_libraries():
+    modules = subprocess.run(
+        [sys.executable, "-c", "import sys, app.solver.solver, app.solver.chunks, app.solver.settings; "
+                               f"config = app.solver.settings.SolverConfig({tile_set_path('circles')!r}, 8, 8); "
+                               "app.solver.solver.Solver(config=config).solve(seed=0); "
+                               "print(' '.join(sys.modules))"],
+        cwd=ROOT_PATH, capture_output=True, text=True, check=True).stdout.split()
+    assert not {"pygame", "PyQt6", "PIL"} & set(modules)
+
+
+def test_solver_defers_heavy_imports():
+    modules = subprocess.run(
+        [sys.executable, "-c", "import sys, app.solver.solver; print(' '.join(sys.modules))"],
+        cwd=ROOT_PATH, capture_output=True, text=True, check=True).stdout.split()
+    # Only solve_async and solve_parallel need these
+    assert not {"asyncio", "multiprocessing", "concurrent.futures"} & set(modules)
@@ -0,0 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import pytest
+from .conftest import tile_set_path
+from ..settings import SolverConfig
+from ..solver import Solver
+
+
+def make_solver(width=12, height=12):
+    config = SolverConfig(tile_set_path("circles"), width, height)
+    return Solver(config=config)
+
+
+def test_solve_async_matches_solve():
+    expected = make_solver()
+    expected.solve(seed=3)
+
+    async def collect(solver):
+        return [progress async for progress in solver.solve_async(seed=3, steps_per_slice=10, deltas=True)]
+
+    solver = make_solver()
+    progress = asyncio.run(collect(solver))
+    assert solver.grid.wave.tile_indexes() == expected.grid.wave.tile_indexes()
+    assert all(0 < update["steps"] <= 10 for update in progress[:-1])
+    assert not any(update["finished"] for update in progress[:-1])
+    assert progress[-1]["solved"] and progress[-1]["collapsed"] == progress[-1]["cells"] == 144
+    assert progress[0]["changes"] is None and progress[1]["changes"]
+
+
+def test_solve_async_interleaves_and_cancels():
+    order = []
+
+    async def run(name, solver, **kwargs):
+        async for progress in solver.solve_async(seed=0, steps_per_slice=5, **kwargs):
+            order.append(name)
+        return progress["solved"]
+
+    async def main():
+        slow = make_solver(30, 30)
+        slow_task = asyncio.create_task(run("slow", slow))
+        with ThreadPoolExecutor(1) as executor:
+            solved = await asyncio.gather(run("a", make_solver()), run("b", make_solver(), executor=executor))
+        slow_task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await slow_task
+        return solved, slow
+
+    solved, slow = asyncio.run(main())
+    assert solved == [True, True]
+    # The solvers on the event loop take turns, one slice each, while the other runs on the executor
+    on_loop = [name for name in order if name != "b"]
+    on_loop = on_loop[:len(on_loop) - on_loop[::-1].index("a")]
+    assert "b" in order and all(first != second for first, second in zip(on_loop, on_loop[1:]))
+    assert not slow.is_solved()
+
+
+def test_solve_parallel():
+    solver = make_solver(8, 8)
+    assert solver.solve_parallel(attempts=2, seed=5)
+    reports = solver.attempt_reports
+    assert [report["worker"] for report in reports] == [0, 1]
+    winners = [report for report in reports if report["solved"]]
+    assert winners and all(report["attempts"] >= 1 for report in reports)
+    assert winners[0]["seed"] % 2 == (5 + winners[0]["worker"]) % 2
+    grid = solver.grid
+    assert solver.is_solved() and not grid.failed_collapsing
+    assert -1 not in grid.wave.tile_indexes()
+    for x in range(grid.width):
+        for y in range(grid.height):
+            tile = grid.grid[x][y].tile
+            assert grid.grid[(x + 1) % grid.width][y].tile in tile.valid_neighbors['right']
+            assert grid.grid[x][(y + 1) % grid.height].tile in tile.valid_neighbors['down']
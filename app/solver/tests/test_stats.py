@@ -0,0 +1,40 @@
+from .conftest import tile_set_path
+from ..settings import SolverConfig
+from ..solver import Solver
+from ..profiling import Profiler
+
+
+def make_solver(engine="AC3", **kwargs):
+    config = SolverConfig(tile_set_path("circles"), 8, 8, propagation_engine=engine)
+    return Solver(config=config, **kwargs)
+
+
+def test_solver_stats_count_the_solve():
+    for engine in ("AC3", "AC4"):
+        solver = make_solver(engine)
+        assert solver.solve(seed=0)
+        stats = solver.stats()
+        assert stats["steps"] > 0
+        assert stats["collapses"] > 0
+        assert 0 < stats["propagations"] <= stats["collapses"]
+        assert stats["cells_visited"] >= stats["propagations"]
+        assert stats["tiles_banned"] > 0
+        assert stats["worklist_peak"] >= 1
+        assert stats["resets"] == stats["restarts"] + 1
+        assert {"step", "collapse", "propagate", "entropy", "reset"} <= set(stats["phase_seconds"])
+
+
+def test_step_callback():
+    steps = []
+    solver = make_solver(on_step=lambda solver, result: steps.append((solver.stats()["steps"], result)))
+    solver.solve(seed=0)
+    assert [step for step, _ in steps] == list(range(1, len(steps) + 1))
+    assert len(steps) == solver.stats()["steps"]
+
+
+def test_profiler_captures_the_solve():
+    solver = make_solver()
+    with Profiler(memory=True) as profiler:
+        solver.solve(seed=0)
+    assert profiler.peak_memory > 0
+    assert "solve_next" in profiler.report()
@@ -1,6 +1,6 @@
-import configparser
 import pytest
-from ..tile import Tile
+import random
+from ..tile import Tile, set_all_valid_neighbors
 
 
 @pytest.fixture
@@ -11,12 +11,9 @@ def setup_tile_blank():
         "down": "0",
         "left": "0"
     }
-    image_path = "blank.png"
+    image_path = "../../base_tiles/tests/blank.png"
     rotations = 0
-    full_image_path = False
-    config = configparser.ConfigParser()
-    config.read('../settings.ini')
-    tile = Tile(image_path, sides, rotations, full_image_path, config)
+    tile = Tile(0, image_path, sides, rotations)
     yield tile
 
 def test_blank_tile_init(setup_tile_blank):
@@ -35,7 +32,6 @@ def test_blank_tile_init(setup_tile_blank):
         'right': set(),
         'up': set()
     }
-    assert setup_tile_blank.directions == ['up','right','down','left']
 
 
 @pytest.fixture
@@ -46,12 +42,9 @@ def setup_tile_symmetric():
         "down": "0",
         "left": "1"
     }
-    image_path = "T.png"
+    image_path = "../../base_tiles/tests/T.png"
     rotations = 4
-    full_image_path = False
-    config = configparser.ConfigParser()
-    config.read('../settings.ini')
-    tile  = Tile(image_path, sides, rotations, full_image_path, config)
+    tile  = Tile(0, image_path, sides, rotations)
     yield tile
 
 def test_symmetric_tile_init(setup_tile_symmetric):
@@ -70,18 +63,14 @@ def test_symmetric_tile_init(setup_tile_symmetric):
         'right': set(),
         'up': set()
     }
-    assert setup_tile_symmetric.directions == ['up', 'right', 'down', 'left']
 
 
 @pytest.fixture
 def setup_tile_asymmetric():
     sides = {"up": "011", "right": "111", "down": "111", "left": "110"}
-    image_path = "5.png"
+    image_path = "../../base_tiles/tests/5.png"
     rotations = 4
-    full_image_path = False
-    config = configparser.ConfigParser()
-    config.read('../settings.ini')
-    tile = Tile(image_path, sides, rotations, full_image_path, config)
+    tile = Tile(0, image_path, sides, rotations)
     yield tile
 
 def test_asymmetric_tile_init(setup_tile_asymmetric):
@@ -95,18 +84,14 @@ def test_asymmetric_tile_init(setup_tile_asymmetric):
         'right': set(),
         'up': set()
     }
-    assert setup_tile_asymmetric.directions == ['up', 'right', 'down', 'left']
 
 
 @pytest.fixture
 def setup_tile_asymmetric_2():
     sides = {"up": "011", "right": "121", "down": "110", "left": "000"}
-    image_path = "4.png"
+    image_path = "../../base_tiles/tests/4.png"
     rotations = 4
-    full_image_path = False
-    config = configparser.ConfigParser()
-    config.read('../settings.ini')
-    tile = Tile(image_path, sides, rotations, full_image_path, config)
+    tile = Tile(0, image_path, sides, rotations)
     yield tile
 
 def test_asymmetric_2_tile_init(setup_tile_asymmetric_2):
@@ -120,18 +105,14 @@ def test_asymmetric_2_tile_init(setup_tile_asymmetric_2):
         'right': set(),
         'up': set()
     }
-    assert setup_tile_asymmetric_2.directions == ['up', 'right', 'down', 'left']
 
 
 @pytest.fixture
 def setup_tile_2rotations():
     sides={"up": "0", "right": "1", "down": "0", "left": "1"}
-    image_path = "b_i.png"
+    image_path = "../../base_tiles/tests/b_i.png"
     rotations = 2
-    full_image_path = False
-    config = configparser.ConfigParser()
-    config.read('../settings.ini')
-    tile = Tile(image_path, sides, rotations, full_image_path, config)
+    tile = Tile(0, image_path, sides, rotations)
     yield tile
 
 def test_2rotations_tile_init(setup_tile_2rotations):
@@ -145,7 +126,6 @@ def test_2rotations_tile_init(setup_tile_2rotations):
         'right': set(),
         'up': set()
     }
-    assert setup_tile_2rotations.directions == ['up', 'right', 'down', 'left']
 
 @pytest.fixture
 def setup_valid_neighbors(setup_tile_blank, setup_tile_symmetric,
@@ -266,8 +246,24 @@ def test_copy_tile_and_rotate_3_time(setup_tile_symmetric):
     assert new_tile.sides['down'] == setup_tile_symmetric.sides['left']
     assert new_tile.sides['left'] == setup_tile_symmetric.sides['up']
 
+def test_tile_holds_no_config(setup_tile_blank):
+    assert not hasattr(setup_tile_blank, 'config')
+    assert not hasattr(setup_tile_blank, 'directions')
+
 def test_copy_tile_and_rotate_deepcopy(setup_tile_blank):
     new_tile = setup_tile_blank.copy_tile_and_rotate(0)
     assert new_tile.sides == setup_tile_blank.sides
     assert new_tile.sides is not setup_tile_blank.sides
     assert new_tile is not setup_tile_blank
+
+
+def test_socket_index_matches_pairwise_comparison():
+    rng = random.Random(0)
+    tiles = [Tile(i, "", {direction: "".join(rng.choice("01") for _ in range(3))
+                          for direction in ("up", "right", "down", "left")})
+             for i in range(60)]
+    set_all_valid_neighbors(tiles)
+    for tile in tiles:
+        for direction, facing in (("up", "down"), ("down", "up"), ("right", "left"), ("left", "right")):
+            expected = {other for other in tiles if other.sides[facing] == tile.sides[direction][::-1]}
+            assert tile.valid_neighbors[direction] == expected
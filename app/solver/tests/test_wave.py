@@ -0,0 +1,109 @@
+import pytest
+from ..wave import Wave, iter_bits
+from ..node import Node
+
+
+class FakeTile:
+    def __init__(self, ext_id, weight=1):
+        self.id = ext_id
+        self.weight = weight
+        self.rotations = 0
+
+
+@pytest.fixture
+def setup_wave():
+    tiles = [FakeTile(i) for i in range(5)]
+    wave = Wave(3, 2, tiles, ['up', 'right', 'down', 'left'])
+    yield wave
+
+
+def test_iter_bits():
+    assert list(iter_bits(0)) == []
+    assert list(iter_bits(0b10110)) == [1, 2, 4]
+
+
+def test_wave_init(setup_wave):
+    assert setup_wave.size == 6
+    assert setup_wave.full_mask == 0b11111
+    assert setup_wave.cells == [0b11111] * 6
+    assert not any(setup_wave.collapsed)
+
+
+def test_wave_mask_round_trip(setup_wave):
+    tiles = {setup_wave.tiles[0], setup_wave.tiles[3]}
+    mask = setup_wave.mask_of(tiles)
+    assert mask == 0b1001
+    assert setup_wave.tiles_of(mask) == tiles
+
+
+def test_wave_neighbors_wrap(setup_wave):
+    assert setup_wave.coordinates(setup_wave.neighbors['left'][setup_wave.index(0, 1)]) == (2, 1)
+    assert setup_wave.coordinates(setup_wave.neighbors['right'][setup_wave.index(2, 0)]) == (0, 0)
+    assert setup_wave.coordinates(setup_wave.neighbors['up'][setup_wave.index(1, 0)]) == (1, 1)
+    assert setup_wave.coordinates(setup_wave.neighbors['down'][setup_wave.index(1, 0)]) == (1, 1)
+
+
+def test_node_view(setup_wave):
+    node = Node(1, 1, setup_wave)
+    assert len(node.get_tile_options()) == 5
+    assert not node.is_collapsed()
+    assert node.tile is None
+
+    node.set_tile_options({setup_wave.tiles[1], setup_wave.tiles[2]})
+    assert setup_wave.cells[node.index] == 0b110
+    assert node.get_reset_updated()
+    assert not node.get_updated()
+
+    assert node.collapse()
+    assert node.is_collapsed()
+    assert node.tile in (setup_wave.tiles[1], setup_wave.tiles[2])
+    assert node.get_tile_options() == {node.tile}
+
+
+def test_node_collapse_no_options(setup_wave):
+    node = Node(0, 0, setup_wave)
+    node.set_tile_options(set())
+    assert not node.collapse()
+
+
+def test_wave_trail_undo(setup_wave):
+    setup_wave.trail = []
+    mark = setup_wave.mark()
+    setup_wave.set_mask(2, 0b11)
+    setup_wave.set_collapsed(2, 1)
+    setup_wave.set_mask(3, 0b100)
+    assert setup_wave.mark() == mark + 3
+    restored = setup_wave.undo(mark)
+    assert sorted(restored) == [2, 2, 3]
+    assert setup_wave.cells == [0b11111] * 6
+    assert not any(setup_wave.collapsed)
+
+
+def test_wave_trail_forget(setup_wave):
+    setup_wave.trail = []
+    for index in range(6):
+        setup_wave.set_mask(index, 0b1)
+    setup_wave.forget(4)
+    assert setup_wave.trail_offset == 4
+    assert len(setup_wave.trail) == 2
+    setup_wave.undo(5)
+    assert setup_wave.cells[5] == 0b11111
+    assert setup_wave.cells[4] == 0b1
+
+
+def test_wave_neighbors_no_wrap():
+    wave = Wave(3, 2, [FakeTile(i) for i in range(5)], ['up', 'right', 'down', 'left'], wrap=False)
+    assert wave.neighbors['left'][wave.index(0, 1)] == -1
+    assert wave.neighbors['up'][wave.index(1, 0)] == -1
+    assert wave.coordinates(wave.neighbors['right'][wave.index(1, 1)]) == (2, 1)
+
+
+def test_reset_tile_is_undone(setup_wave):
+    setup_wave.trail = []
+    node = Node(0, 0, setup_wave)
+    node.collapse()
+    mark = setup_wave.mark()
+    node.reset_tile(setup_wave.tiles)
+    assert not node.collapsed and setup_wave.cells[0] == setup_wave.full_mask
+    setup_wave.undo(mark)
+    assert node.collapsed and node.tile is not None
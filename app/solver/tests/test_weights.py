@@ -0,0 +1,41 @@
+import random
+import pytest
+from ..weights import WeightTable
+
+
+class FakeTile:
+    def __init__(self, weight):
+        self.weight = weight
+
+
+@pytest.fixture
+def setup_weight_table():
+    yield WeightTable([FakeTile(1), FakeTile(1), FakeTile(998), FakeTile(0)])
+
+
+def test_weight_table_init(setup_weight_table):
+    assert setup_weight_table.weights == [1.0, 1.0, 998.0, 0.0]
+    assert setup_weight_table.total == 1000.0
+    assert setup_weight_table.weight_log_weights[0] == 0.0
+    assert setup_weight_table.weight_log_weights[3] == 0.0
+
+
+def test_weight_table_mask_sum(setup_weight_table):
+    assert setup_weight_table.mask_sum(0b0011) == 2.0
+    assert setup_weight_table.mask_sum(0b1111) == 1000.0
+
+
+def test_weight_table_sample_stays_in_mask(setup_weight_table):
+    rng = random.Random(1)
+    for mask in (0b0001, 0b0011, 0b0110, 0b1111, 0b1000, 0b1001):
+        for _ in range(50):
+            assert mask >> setup_weight_table.sample(mask, rng=rng) & 1
+
+
+def test_weight_table_sample_follows_weights(setup_weight_table):
+    rng = random.Random(1)
+    samples = [setup_weight_table.sample(0b1111, rng=rng) for _ in range(2000)]
+    assert samples.count(2) > 1900
+    assert samples.count(3) == 0
+    samples = [setup_weight_table.sample(0b0011, rng=rng) for _ in range(2000)]
+    assert 800 < samples.count(0) < 1200
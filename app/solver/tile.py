@@ -1,14 +1,35 @@
 import copy
-import configparser
 from typing import Self
 
+DEFAULT_DIRECTIONS = ('up', 'right', 'down', 'left')
+
+
+def socket_index(tiles, directions=DEFAULT_DIRECTIONS):
+    """Indexes tiles by the socket on each of their sides, so the tiles matching a socket are found by lookup instead
+    of comparing against every tile.
+    Returns:
+        dict of direction -> dict of socket -> list of tiles with that socket on that side."""
+    index = {direction: dict() for direction in directions}
+    for tile in tiles:
+        for direction in directions:
+            index[direction].setdefault(tile.sides[direction], []).append(tile)
+    return index
+
+
+def set_all_valid_neighbors(tiles, directions=DEFAULT_DIRECTIONS):
+    """Sets up the valid neighbors of every tile in tiles, among those same tiles. The socket index is built once, so
+    the cost grows with the number of matching pairs rather than with the square of the number of tiles."""
+    index = socket_index(tiles, directions)
+    for tile in tiles:
+        tile.set_valid_neighbors(tiles, directions, index)
+
 
 class Tile:
     """
     Prototype class for defining a set of rules for a tile. Think of it like a blueprint for a node.
     A node will have a list of tiles which represents the different superpositions of tiles it can be.
     """
-    def __init__(self, ext_id: int, image_path: str, sides, rotations=0, full_image_path=False, config=None, weight=1):
+    def __init__(self, ext_id: int, image_path: str, sides, rotations=0, weight=1, symmetry=4):
         """
         - Define a set of rules for a tile
             - Holds an image path pointing to disk
@@ -20,27 +41,20 @@ class Tile:
         - Used as a blueprint when collapsing cells
         :param sides: definition for the side. Tiles are valid next to each other when their sides match.
         :param rotations: How many permutations of this tile by rotation are there?
-        :param image_path: The file name of the image or full path, depending on full_image_path parameter.
-        :param full_image_path: Boolean detailing if image_path is a full path or just the filename
-        :param config: configParser used to read settings.ini for initialization
+        :param image_path: The path of the image.
+        :param weight: How frequently this tile is chosen compared to other tiles.
+        :param symmetry: The fewest quarter turns after which the image looks the same, as declared in the tile set:
+            1 or 2, or 4 if it only looks the same after a full turn.
         """
-        if config is None:
-            config = configparser.ConfigParser()
-            config.read('../../settings.ini')
-        self.config = config
-        if not full_image_path:
-            self.image_path = (f"../../{config['tiles']['TILE_SET_FOLDER']}/"
-                               f"{config["tiles"]["TILE_SET_NAME"]}/{image_path}")
-        else:
-            self.image_path = f"{image_path}"
+        self.image_path = f"{image_path}"
         self.id = ext_id
         self.sides = sides
         self.rotations = rotations
         self.weight = weight
+        self.symmetry = symmetry
 
         #Directions
         self.valid_neighbors = {direction:set() for direction in sides}
-        self.directions = (config['tiles']['DIRECTIONS']).split(',')
 
 
     def __str__(self):
@@ -48,36 +62,42 @@ class Tile:
         return f"Tile({self.id}_{self.rotations}_{self.sides})"
 
 
-    def set_valid_neighbors(self, tiles) -> None:
+    def set_valid_neighbors(self, tiles, directions=DEFAULT_DIRECTIONS, index=None) -> None:
         """
         Given a set of tiles, sets up a list of valid neighbors for this tile by comparing their sides.
+        A neighbor is valid when its facing side is this tile's side reversed.
         Parameter:
             tiles: a set of tiles
+            directions: names of the directions, in the order up, right, down, left
+            index: socket_index of tiles, when setting up many tiles against the same tiles. Built if not given
         """
-        up, right, down, left = self.directions
-        for other_tile in tiles:
-            #DOWN
-            if other_tile.sides[down] == self.sides[up][::-1]:
-                self.valid_neighbors[up].add(other_tile)
-            #UP
-            if other_tile.sides[up] == self.sides[down][::-1]:
-                self.valid_neighbors[down].add(other_tile)
-            #RIGHT
-            if other_tile.sides[left] == self.sides[right][::-1]:
-                self.valid_neighbors[right].add(other_tile)
-            #LEFT
-            if other_tile.sides[right] == self.sides[left][::-1]:
-                self.valid_neighbors[left].add(other_tile)
+        if index is None:
+            index = socket_index(tiles, directions)
+        up, right, down, left = directions
+        for direction, facing in ((up, down), (down, up), (right, left), (left, right)):
+            self.valid_neighbors[direction].update(index[facing].get(self.sides[direction][::-1], ()))
+
+    def side_signature(self, directions=DEFAULT_DIRECTIONS):
+        """Returns the tile's sockets in direction order. Tiles with the same signature have the same neighbors."""
+        return tuple(self.sides[direction] for direction in directions)
+
+    def renders_like(self, other):
+        """Returns whether this tile and other, a rotation of the same image, look the same on screen. Decided by the
+        symmetry declared in the tile set rather than by reading the image, so it does not depend on an image library."""
+        if self.image_path != other.image_path:
+            return False
+        return (other.rotations - self.rotations) % self.symmetry == 0
 
-    def copy_tile_and_rotate(self, rotations: int) -> Self:
+    def copy_tile_and_rotate(self, rotations: int, directions=DEFAULT_DIRECTIONS) -> Self:
         """
         Given a number of times to rotate, rotates the tile.
         :param rotations: Number of times to rotate
+        :param directions: names of the directions, in the order up, right, down, left
         :return:
             New tile instance after rotation
         """
         sides = copy.deepcopy(self.sides)
-        up, right, down, left = self.directions
+        up, right, down, left = directions
         if rotations == 1:
             sides[up] = self.sides[left]
             sides[right] = self.sides[up]
@@ -94,5 +114,4 @@ class Tile:
             sides[down] = self.sides[left]
             sides[left] = self.sides[up]
         return Tile(ext_id=self.id, sides=sides, image_path=self.image_path,
-                    rotations=rotations, full_image_path=True,
-                    config=self.config, weight=self.weight)
\ No newline at end of file
+                    rotations=rotations, weight=self.weight, symmetry=self.symmetry)
\ No newline at end of file
@@ -0,0 +1,168 @@
+from app.solver.weights import WeightTable
+import random
+
+DIRECTION_OFFSETS = {"up": (0, -1), "right": (1, 0), "down": (0, 1), "left": (-1, 0)}
+OPPOSITE_DIRECTIONS = {"up": "down", "right": "left", "down": "up", "left": "right"}
+
+
+def iter_bits(mask):
+    """Yields the index of every set bit in a mask, lowest bit first."""
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+class Wave:
+    """
+    The state of every node on the grid, stored compactly.
+    Each cell's domain is an integer bitmask where bit i set means tiles[i] is still an option for that cell.
+    Nodes are thin views onto a wave, so the solver can work on plain integers instead of sets of tiles.
+    """
+    def __init__(self, width, height, tiles, directions, wrap=True, rng=None):
+        """
+        Instance of the wave for a width x height grid.
+            tiles: list of all tiles after permutations. A tile's position in this list is its tile index.
+            tile_index: lookup from tile to its tile index
+            full_mask: mask with every tile set
+            weights: precomputed weight tables of the tiles, used when sampling a tile to collapse to
+            rng: source of every random choice made on this wave. Defaults to the global random module
+            cells: flat list of masks, one per cell. Cell (x, y) lives at index x * height + y
+            collapsed: flag per cell for whether it has been collapsed
+            updated: flag per cell telling the GUI if it should reload the node's image
+            wrap: whether the grid wraps around at the edges, making it a torus
+            neighbors: for each direction, the index of the neighboring cell. When the grid does not wrap, cells on
+                the edge have no neighbor past it, marked by -1.
+            observers: objects notified through cell_changed(index, old_mask) when a cell changes
+                and wave_reset() when restored from a snapshot
+            trail: when not None, every change is recorded as (index, old mask, old collapsed) so it can be undone
+            trail_offset: number of entries forgotten from the front of the trail
+        """
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.tiles = list(tiles)
+        self.tile_index = {tile: i for i, tile in enumerate(self.tiles)}
+        self.full_mask = (1 << len(self.tiles)) - 1
+        self.weights = WeightTable(self.tiles)
+        self.rng = rng or random
+        self.directions = directions
+        self.wrap = wrap
+        self.neighbors = {direction: self.build_neighbors(direction) for direction in directions}
+        self.cells = [self.full_mask] * self.size
+        self.collapsed = bytearray(self.size)
+        self.updated = bytearray(self.size)
+        self.observers = []
+        self.trail = None
+        self.trail_offset = 0
+
+    def build_neighbors(self, direction):
+        """Returns a list mapping each cell index to the index of its neighbor in the given direction."""
+        dx, dy = DIRECTION_OFFSETS[direction]
+        if self.wrap:
+            return [self.index((x + dx) % self.width, (y + dy) % self.height)
+                    for x in range(self.width) for y in range(self.height)]
+        return [self.index(x + dx, y + dy) if 0 <= x + dx < self.width and 0 <= y + dy < self.height else -1
+                for x in range(self.width) for y in range(self.height)]
+
+    def snapshot(self):
+        """Returns a copy of every cell's domain and collapsed flag, to be put back with restore."""
+        return list(self.cells), bytes(self.collapsed)
+
+    def restore(self, snapshot):
+        """Puts every cell back to the state in a snapshot, copying it over in bulk, then notifies the observers
+        through wave_reset."""
+        cells, collapsed = snapshot
+        self.cells[:] = cells
+        self.collapsed[:] = collapsed
+        self.updated[:] = b"\x01" * self.size
+        if self.trail is not None:
+            self.trail = []
+            self.trail_offset = 0
+        for observer in self.observers:
+            observer.wave_reset()
+
+    #Get/set
+    def index(self, x, y):
+        """Returns the cell index of coordinates (x, y)."""
+        return x * self.height + y
+
+    def coordinates(self, index):
+        """Returns the (x, y) coordinates of a cell index."""
+        return divmod(index, self.height)
+
+    def mask_of(self, tiles):
+        """Returns the mask representing a collection of tiles."""
+        mask = 0
+        for tile in tiles:
+            mask |= 1 << self.tile_index[tile]
+        return mask
+
+    def tiles_of(self, mask):
+        """Returns the set of tiles represented by a mask."""
+        return {self.tiles[i] for i in iter_bits(mask)}
+
+    def tile_indexes(self):
+        """Returns a flat list of the tile index of every cell, or -1 for cells that are not down to one tile."""
+        return [mask.bit_length() - 1 if mask and not mask & (mask - 1) else -1 for mask in self.cells]
+
+    def set_mask(self, index, mask):
+        """Sets the domain of a cell and flags it as updated."""
+        old_mask = self.cells[index]
+        if self.trail is not None:
+            self.trail.append((index, old_mask, self.collapsed[index]))
+        self.cells[index] = mask
+        self.updated[index] = 1
+        for observer in self.observers:
+            observer.cell_changed(index, old_mask)
+
+    def set_uncollapsed(self, index, mask):
+        """Sets the domain of a cell and clears its collapsed flag."""
+        old_mask = self.cells[index]
+        if self.trail is not None:
+            self.trail.append((index, old_mask, self.collapsed[index]))
+        self.cells[index] = mask
+        self.collapsed[index] = 0
+        self.updated[index] = 1
+        for observer in self.observers:
+            observer.cell_changed(index, old_mask)
+
+    def set_collapsed(self, index, tile_index):
+        """Collapses a cell to a single tile."""
+        old_mask = self.cells[index]
+        if self.trail is not None:
+            self.trail.append((index, old_mask, self.collapsed[index]))
+        self.cells[index] = 1 << tile_index
+        self.collapsed[index] = 1
+        self.updated[index] = 1
+        for observer in self.observers:
+            observer.cell_changed(index, old_mask)
+
+    #Trail
+    def mark(self):
+        """Returns a position on the trail which the wave can later be undone back to."""
+        return self.trail_offset + len(self.trail)
+
+    def undo(self, mark):
+        """Undoes every change recorded since a mark, most recent first.
+        Returns:
+            list of the indexes of the restored cells."""
+        trail, cells, collapsed = self.trail, self.cells, self.collapsed
+        restored = []
+        while self.trail_offset + len(trail) > mark:
+            index, old_mask, old_collapsed = trail.pop()
+            new_mask = cells[index]
+            cells[index] = old_mask
+            collapsed[index] = old_collapsed
+            self.updated[index] = 1
+            restored.append(index)
+            for observer in self.observers:
+                observer.cell_changed(index, new_mask)
+        return restored
+
+    def forget(self, mark):
+        """Allows the trail to discard changes recorded before a mark, as they will never be undone."""
+        forgettable = mark - self.trail_offset
+        if forgettable > len(self.trail) // 2:
+            del self.trail[:forgettable]
+            self.trail_offset = mark
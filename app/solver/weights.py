@@ -0,0 +1,102 @@
+import math
+import random
+
+
+class WeightTable:
+    """
+    Per-tile weight tables, precomputed once for a list of tiles so that collapsing a node does not have to rebuild
+    lists of options and weights.
+    Sampling from a cell that still holds most of the total weight uses an alias table over every tile and rejects
+    tiles the cell no longer allows, which takes O(1) expected draws. Cells holding little weight are sampled by
+    walking their remaining options.
+    """
+    MAX_CACHED_MASKS = 1 << 16
+
+    def __init__(self, tiles):
+        """
+            weights: weight of each tile, indexed by tile index
+            weight_log_weights: w * log(w) for each tile, used for Shannon entropy
+            total: sum of every tile's weight
+            alias_probability, alias: Vose alias table over every tile
+            sum_cache: memo of mask -> sum of weights in the mask
+        """
+        self.weights = [float(tile.weight) for tile in tiles]
+        self.weight_log_weights = [weight * math.log(weight) if weight > 0 else 0.0 for weight in self.weights]
+        self.total = sum(self.weights)
+        self.alias_probability, self.alias = self.build_alias_table()
+        self.sum_cache = dict()
+
+    def build_alias_table(self):
+        """Builds a Vose alias table over every tile's weight.
+        Returns:
+            probability and alias lists, indexed by tile index."""
+        count = len(self.weights)
+        probability, alias = [1.0] * count, list(range(count))
+        if not count or self.total <= 0:
+            return probability, alias
+        scaled = [weight * count / self.total for weight in self.weights]
+        small = [i for i, weight in enumerate(scaled) if weight < 1.0]
+        large = [i for i, weight in enumerate(scaled) if weight >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            probability[less] = scaled[less]
+            alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        return probability, alias
+
+    def mask_sum(self, mask):
+        """Returns the sum of the weights of every tile in a mask."""
+        weight_sum = self.sum_cache.get(mask)
+        if weight_sum is None:
+            weights, weight_sum, remaining = self.weights, 0.0, mask
+            while remaining:
+                lowest = remaining & -remaining
+                weight_sum += weights[lowest.bit_length() - 1]
+                remaining ^= lowest
+            if len(self.sum_cache) >= self.MAX_CACHED_MASKS:
+                self.sum_cache.clear()
+            self.sum_cache[mask] = weight_sum
+        return weight_sum
+
+    def sample(self, mask, weight_sum=None, rng=random):
+        """Randomly chooses a tile from a mask, with probability proportional to its weight.
+        Parameters:
+            mask: the tiles to choose from. Must not be empty.
+            weight_sum: the sum of the weights in the mask, if the caller already knows it
+            rng: source of randomness
+        Returns:
+            The chosen tile index."""
+        if weight_sum is None:
+            weight_sum = self.mask_sum(mask)
+        if weight_sum <= 0:
+            options = []
+            while mask:
+                lowest = mask & -mask
+                options.append(lowest.bit_length() - 1)
+                mask ^= lowest
+            return rng.choice(options)
+
+        if weight_sum * 2 >= self.total:
+            probability, alias, count = self.alias_probability, self.alias, len(self.weights)
+            while True:
+                tile_index = int(rng.random() * count)
+                if rng.random() >= probability[tile_index]:
+                    tile_index = alias[tile_index]
+                if mask >> tile_index & 1:
+                    return tile_index
+
+        weights = self.weights
+        target = rng.random() * weight_sum
+        tile_index = 0
+        while mask:
+            lowest = mask & -mask
+            tile_index = lowest.bit_length() - 1
+            target -= weights[tile_index]
+            if target < 0:
+                return tile_index
+            mask ^= lowest
+        return tile_index